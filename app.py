@@ -1,7 +1,100 @@
+import hashlib
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
 import streamlit as st
 import pandas as pd
-from utils import extract_features
-from scoring import calculate_credit_score
+from streamlit.runtime.scriptrunner import add_script_run_ctx, get_script_run_ctx
+from udaancredit.aml import model_outliers, model_version
+from udaancredit.anomalies import amount_outliers, anomaly_status, find_activity_gaps, spike_days
+from udaancredit.features import extract_features
+from udaancredit.graph import CounterpartyGraph, counterparty_flags
+from udaancredit.ingest import read_statement
+from udaancredit.instrumentation import (
+    add_run_spans,
+    begin_run,
+    cache_miss,
+    cached_stage,
+    enable,
+    incr,
+    prometheus_text,
+    run_spans,
+    serve_prometheus,
+    snapshot,
+    span,
+    write_prometheus,
+)
+from udaancredit.paging import PAGE_SIZE, SORT_COLUMNS, transaction_page
+from udaancredit.results import RESULTS_VERSION, ResultStore
+from udaancredit.rollups import chart_series, volume_rollups
+from udaancredit.scoring import SCORING_VERSION, assess_risk, calculate_credit_score, eligible_amount, loan_rate
+from udaancredit.store import append_transactions, read_transactions, store_signature
+from udaancredit.windows import DEFAULT_WINDOWS, windowed_features
+
+CACHE_MAX_ENTRIES = 64
+CACHE_TTL_SECONDS = 3600
+METRICS_FILE = os.environ.get("UDAAN_METRICS_FILE")
+METRICS_PORT = os.environ.get("UDAAN_METRICS_PORT")
+# per browser session: the volume and anomaly jobs of one run
+SESSION_WORKERS = 2
+VOLUME_CAPTIONS = {"day": "Daily", "week": "Weekly", "month": "Monthly"}
+STYLESHEET = os.path.join(os.path.dirname(os.path.abspath(__file__)), "static", "app.css")
+
+
+def session_pool():
+    # each session gets its own small pool, so one large statement only queues
+    # behind its own session's jobs rather than every other agent's; the idle
+    # workers exit once the session's state is dropped
+    pool = st.session_state.get("background_pool")
+    if pool is None:
+        pool = st.session_state["background_pool"] = ThreadPoolExecutor(
+            max_workers=SESSION_WORKERS, thread_name_prefix="udaan-bg"
+        )
+    return pool
+
+
+def verified_email():
+    # the identity provider's email after st.login(); the login form's email is
+    # free text, so stored history is never saved or loaded by it
+    if st.user.get("is_logged_in") and st.user.get("email"):
+        return st.user.get("email")
+    return None
+
+
+def auth_configured():
+    try:
+        return "auth" in st.secrets
+    except FileNotFoundError:
+        return False
+
+
+@st.cache_resource
+def result_store(version):
+    # scores persisted across restarts, keyed by user and statement content;
+    # the version also covers the AML model, which changes the anomaly counts
+    return ResultStore(version=version)
+
+
+@st.cache_resource
+def counterparty_graph():
+    # one graph for the process, so round trips between different users'
+    # statements are seen; re-uploaded rows are skipped, not added twice
+    return CounterpartyGraph(dedupe=True), threading.Lock()
+
+
+def graph_flags(node, df):
+    graph, lock = counterparty_graph()
+    with lock:
+        return counterparty_flags(df, user_id=node, graph=graph)
+
+
+@st.cache_resource
+def stylesheet():
+    # read once per process instead of re-parsing a large inline block per rerun
+    with open(STYLESHEET, encoding="utf-8") as f:
+        return f.read()
+
 
 st.set_page_config(
     page_title="UdaanCredit",
@@ -9,260 +102,115 @@ st.set_page_config(
     layout="wide"
 )
 
-st.markdown("""
-<style>
-@import url('https://fonts.googleapis.com/css2?family=Sora:wght@300;400;600;700;800&family=JetBrains+Mono:wght@400;500&display=swap');
-
-html, body, [class*="css"] {
-    font-family: 'Sora', sans-serif !important;
-}
-.stApp {
-    background: #04070f;
-    color: #e8eef8;
-}
- 
-#MainMenu, footer, header { visibility: hidden; }
-.block-container {
-    padding-top: 2rem !important;
-    padding-bottom: 2rem !important;
-    max-width: 1100px;
-}
-
-
-.stApp::before {
-    content: '';
-    position: fixed; inset: 0; z-index: 0; pointer-events: none;
-    background:
-        radial-gradient(ellipse 80% 60% at 20% 10%, rgba(59,130,246,0.09) 0%, transparent 60%),
-        radial-gradient(ellipse 60% 50% at 80% 80%, rgba(34,211,238,0.07) 0%, transparent 60%);
-}
-
-
-.stTextInput > div > div > input,
-.stFileUploader > div {
-    background: #0b1120 !important;
-    border: 1px solid rgba(255,255,255,0.08) !important;
-    border-radius: 10px !important;
-    color: #e8eef8 !important;
-    font-family: 'Sora', sans-serif !important;
-}
-.stTextInput > div > div > input:focus {
-    border-color: rgba(59,130,246,0.5) !important;
-    box-shadow: 0 0 0 3px rgba(59,130,246,0.1) !important;
-}
-.stTextInput label, .stFileUploader label {
-    color: #7a90b0 !important;
-    font-size: 0.78rem !important;
-    font-weight: 600 !important;
-    letter-spacing: 0.06em !important;
-    font-family: 'JetBrains Mono', monospace !important;
-}
-
-
-.stButton > button {
-    background: linear-gradient(135deg, #3b82f6, #1d4ed8) !important;
-    color: white !important;
-    border: none !important;
-    border-radius: 10px !important;
-    font-weight: 700 !important;
-    font-family: 'Sora', sans-serif !important;
-    padding: 0.6rem 1.2rem !important;
-    box-shadow: 0 0 24px rgba(59,130,246,0.3) !important;
-    transition: all 0.2s !important;
-}
-.stButton > button:hover {
-    box-shadow: 0 0 36px rgba(59,130,246,0.5) !important;
-    transform: translateY(-1px) !important;
-}
-.stButton > button[kind="secondary"] {
-    background: transparent !important;
-    border: 1px solid rgba(255,255,255,0.1) !important;
-    color: #7a90b0 !important;
-    box-shadow: none !important;
-}
-
-
-[data-testid="metric-container"] {
-    background: #0b1120;
-    border: 1px solid rgba(255,255,255,0.07);
-    border-radius: 14px;
-    padding: 20px !important;
-}
-[data-testid="metric-container"] label {
-    color: #7a90b0 !important;
-    font-size: 0.78rem !important;
-    font-family: 'JetBrains Mono', monospace !important;
-    letter-spacing: 0.06em !important;
-}
-[data-testid="metric-container"] [data-testid="stMetricValue"] {
-    color: #e8eef8 !important;
-    font-size: 1.6rem !important;
-    font-weight: 700 !important;
-}
-
-
-[data-testid="stArrowVegaLiteChart"], .stLineChart, .stBarChart {
-    background: transparent !important;
-    border-radius: 10px;
-}
-
-
-.stAlert { border-radius: 10px !important; }
-
-
-hr { border-color: rgba(255,255,255,0.06) !important; }
-
-
-.udaan-nav {
-    display: flex; justify-content: space-between; align-items: center;
-    padding: 0 0 24px 0;
-    border-bottom: 1px solid rgba(255,255,255,0.06);
-    margin-bottom: 32px;
-}
-.udaan-logo {
-    display: flex; align-items: center; gap: 10px;
-    font-size: 1.2rem; font-weight: 800; color: #e8eef8;
-    letter-spacing: -0.02em;
-}
-.udaan-logo-icon {
-    width: 34px; height: 34px;
-    background: linear-gradient(135deg, #3b82f6, #22d3ee);
-    border-radius: 9px;
-    display: inline-flex; align-items: center; justify-content: center;
-    font-size: 16px; font-weight: 800;
-}
-.udaan-user {
-    font-size: 0.82rem; color: #7a90b0;
-    font-family: 'JetBrains Mono', monospace;
-}
-
-.login-wrap {
-    max-width: 420px; margin: 10vh auto 0;
-}
-.login-card {
-    background: #0b1120;
-    border: 1px solid rgba(255,255,255,0.07);
-    border-radius: 24px; padding: 44px 40px;
-    box-shadow: 0 0 80px rgba(59,130,246,0.07);
-}
-.login-brand {
-    text-align: center; margin-bottom: 28px;
-}
-.login-title {
-    font-size: 1.55rem; font-weight: 800;
-    letter-spacing: -0.02em; text-align: center;
-    color: #e8eef8; margin-bottom: 6px;
-}
-.login-sub {
-    color: #7a90b0; font-size: 0.88rem;
-    text-align: center; margin-bottom: 28px;
-}
-.login-footer {
-    text-align: center; font-size: 0.74rem;
-    color: #3a4f6a; margin-top: 16px;
-}
-
-.section-card {
-    background: #0b1120;
-    border: 1px solid rgba(255,255,255,0.07);
-    border-radius: 18px; padding: 28px;
-    margin-bottom: 20px;
-}
-.section-header {
-    display: flex; align-items: center; gap: 10px;
-    margin-bottom: 20px;
-}
-.section-title {
-    font-size: 1rem; font-weight: 700; color: #e8eef8;
-}
-.section-icon {
-    font-size: 1.1rem;
-}
-
-.score-display {
-    display: flex; align-items: center; gap: 32px;
-    padding: 24px;
-    background: linear-gradient(135deg, rgba(59,130,246,0.1), rgba(34,211,238,0.06));
-    border: 1px solid rgba(59,130,246,0.2);
-    border-radius: 16px; margin-bottom: 20px;
-}
-.score-number {
-    font-size: 4rem; font-weight: 800;
-    background: linear-gradient(135deg, #22d3ee, #3b82f6);
-    -webkit-background-clip: text; -webkit-text-fill-color: transparent;
-    background-clip: text; line-height: 1;
-    font-family: 'JetBrains Mono', monospace;
-}
-.score-label {
-    font-size: 0.75rem; color: #7a90b0;
-    font-family: 'JetBrains Mono', monospace; letter-spacing: 0.1em;
-    margin-bottom: 6px;
-}
-.score-desc { font-size: 0.88rem; color: #e8eef8; }
-.score-out { font-size: 0.78rem; color: #7a90b0; margin-top: 4px; }
-
-.risk-pill {
-    display: inline-flex; align-items: center; gap: 8px;
-    padding: 10px 18px; border-radius: 100px;
-    font-weight: 700; font-size: 0.9rem;
-}
-.risk-low { background: rgba(16,185,129,0.12); color: #34d399; border: 1px solid rgba(16,185,129,0.25); }
-.risk-medium { background: rgba(245,158,11,0.12); color: #fbbf24; border: 1px solid rgba(245,158,11,0.25); }
-.risk-high { background: rgba(239,68,68,0.12); color: #f87171; border: 1px solid rgba(239,68,68,0.25); }
-
-.loan-card {
-    background: linear-gradient(135deg, rgba(16,185,129,0.08), rgba(34,211,238,0.04));
-    border: 1px solid rgba(16,185,129,0.2);
-    border-radius: 16px; padding: 24px;
-    display: flex; justify-content: space-between; align-items: center;
-    flex-wrap: wrap; gap: 16px;
-}
-.loan-amount {
-    font-size: 2rem; font-weight: 800; color: #34d399;
-    font-family: 'JetBrains Mono', monospace;
-}
-.loan-label { font-size: 0.75rem; color: #7a90b0; font-family: 'JetBrains Mono', monospace; letter-spacing: 0.1em; margin-bottom: 4px; }
-.loan-rate { font-size: 0.85rem; color: #7a90b0; }
-
-.verdict-badge {
-    display: inline-flex; align-items: center; gap: 8px;
-    padding: 12px 20px; border-radius: 12px;
-    font-weight: 700; font-size: 0.92rem;
-}
-.verdict-approved { background: rgba(16,185,129,0.12); color: #34d399; border: 1px solid rgba(16,185,129,0.25); }
-.verdict-conditional { background: rgba(245,158,11,0.12); color: #fbbf24; border: 1px solid rgba(245,158,11,0.25); }
-.verdict-rejected { background: rgba(239,68,68,0.12); color: #f87171; border: 1px solid rgba(239,68,68,0.25); }
-
-.factor-row {
-    display: flex; align-items: center; gap: 12px;
-    margin-bottom: 12px;
-}
-.factor-label-text {
-    font-size: 0.78rem; color: #7a90b0; width: 160px; flex-shrink: 0;
-}
-.factor-bar-bg {
-    flex: 1; height: 6px;
-    background: rgba(255,255,255,0.05);
-    border-radius: 100px; overflow: hidden;
-}
-.factor-bar-fill {
-    height: 100%; border-radius: 100px;
-    background: linear-gradient(90deg, #3b82f6, #22d3ee);
-}
-.factor-val-text {
-    font-size: 0.75rem; color: #e8eef8;
-    font-family: 'JetBrains Mono', monospace;
-    width: 44px; text-align: right;
-}
-
-.upload-hint {
-    font-size: 0.78rem; color: #3a4f6a;
-    font-family: 'JetBrains Mono', monospace;
-    margin-top: 8px;
-}
-.mono { font-family: 'JetBrains Mono', monospace; }
-</style>
-""", unsafe_allow_html=True)
+# process-wide tracing and the debug panel are operator-only, never a URL toggle
+DEBUG = os.environ.get("UDAAN_DEBUG") == "1"
+if DEBUG or METRICS_FILE or METRICS_PORT:
+    enable()
+if METRICS_PORT:
+    serve_prometheus(int(METRICS_PORT))
+begin_run()
+incr("reruns_total")
+
+st.markdown(f"<style>{stylesheet()}</style>", unsafe_allow_html=True)
+
+
+
+# Pipeline stages are cached across reruns and sessions, keyed by the uploaded
+# file's content hash (plus SCORING_VERSION where scoring logic is involved).
+# Arguments starting with "_" are excluded from Streamlit's cache key.
+@st.cache_data(max_entries=CACHE_MAX_ENTRIES, ttl=CACHE_TTL_SECONDS, show_spinner=False)
+def parse_statement(content_hash, _data):
+    cache_miss()
+    df, quarantine = read_statement(_data)
+    incr("rows_processed_total", len(df), stage="ingest")
+    return df, quarantine
+
+
+@st.cache_data(max_entries=CACHE_MAX_ENTRIES, ttl=CACHE_TTL_SECONDS, show_spinner=False)
+def load_history(content_hash, user_id):
+    cache_miss()
+    return read_transactions(user_id=user_id)
+
+
+@st.cache_data(max_entries=CACHE_MAX_ENTRIES, ttl=CACHE_TTL_SECONDS, show_spinner=False)
+def score_statement(content_hash, scoring_version, _df):
+    cache_miss()
+    features = extract_features(_df.copy()) | windowed_features(_df)
+    score = calculate_credit_score(features)
+    return features, score
+
+
+@st.cache_data(max_entries=CACHE_MAX_ENTRIES, ttl=CACHE_TTL_SECONDS, show_spinner=False)
+def volume_totals(content_hash, _df):
+    # day/week/month rollups, shared by the volume chart and spike detection
+    cache_miss()
+    return volume_rollups(_df)
+
+
+@st.cache_data(max_entries=CACHE_MAX_ENTRIES, ttl=CACHE_TTL_SECONDS, show_spinner=False)
+def detect_anomalies(content_hash, scoring_version, aml_version, _df):
+    # aml_version is the AML model file's mtime, or None to use the z-score rule;
+    # counterparty flags depend on other users' statements, so aren't cached here
+    cache_miss()
+    anomalies = model_outliers(_df) if aml_version else amount_outliers(_df)
+    spike_dates = spike_days(volume_totals(content_hash, _df)["day"])
+    with span("app.activity_gaps"):
+        gaps = find_activity_gaps(_df['date'])
+    return anomalies, spike_dates, gaps
+
+
+def in_background(stage, fn, *args):
+    # runs fn on this session's pool with its script context, so the
+    # st.cache_data functions it calls still share the cross-rerun cache
+    ctx = get_script_run_ctx()
+
+    def run():
+        add_script_run_ctx(threading.current_thread(), ctx)
+        begin_run()
+        with cached_stage(stage):
+            result = fn(*args)
+        return result, run_spans()
+
+    return session_pool().submit(run)
+
+
+def collect(job):
+    # waits for a background stage and merges its spans into this run's
+    result, spans = job.result()
+    add_run_spans(spans)
+    return result
+
+
+@st.fragment
+def transaction_viewer(key, frame):
+    # server-side filter/sort/page: only the visible page is sent to the browser
+    f1, f2, f3, f4 = st.columns([2, 3, 2, 2])
+    types = f1.multiselect("Type", ["CREDIT", "DEBIT"], key=f"{key}_types")
+    dates = f2.date_input("Dates", value=(), key=f"{key}_dates")
+    min_amount = f3.number_input("Min amount", min_value=0.0, value=None, key=f"{key}_min")
+    max_amount = f4.number_input("Max amount", min_value=0.0, value=None, key=f"{key}_max")
+    s1, s2, s3 = st.columns([2, 2, 2])
+    sort_by = s1.selectbox("Sort by", SORT_COLUMNS, key=f"{key}_sort")
+    descending = s2.toggle("Descending", key=f"{key}_desc")
+    page = s3.number_input("Page", min_value=1, value=1, step=1, key=f"{key}_page")
+
+    rows, summary = transaction_page(
+        frame,
+        page=page - 1,
+        page_size=PAGE_SIZE,
+        sort_by=sort_by,
+        descending=descending,
+        types=types,
+        start=dates[0] if len(dates) > 0 else None,
+        end=dates[1] if len(dates) > 1 else None,
+        min_amount=min_amount,
+        max_amount=max_amount,
+    )
+    st.dataframe(rows, use_container_width=True, hide_index=True)
+    st.caption(
+        f"Page {summary['page'] + 1} of {summary['pages']} · {summary['rows']:,} matching rows · "
+        f"credit ₹{summary['total_credit']:,.0f} · debit ₹{summary['total_debit']:,.0f}"
+    )
 
 
 if "page" not in st.session_state:
@@ -343,7 +291,35 @@ elif st.session_state.page == "dashboard":
     )
     st.markdown('<div class="upload-hint">Supported: PhonePe · Google Pay · Paytm · BHIM · Any UPI app CSV export</div>', unsafe_allow_html=True)
 
-    if not uploaded_file:
+    df = None
+    history_user = verified_email()
+    if uploaded_file:
+        data = uploaded_file.getvalue()
+        content_hash = hashlib.sha256(data).hexdigest()
+        try:
+            with cached_stage("app.parse"):
+                df, quarantine = parse_statement(content_hash, data)
+        except ValueError as e:
+            st.error(f"Could not read this statement: {e}")
+            st.stop()
+        if len(quarantine) > 0:
+            st.warning(f"{len(quarantine)} row(s) could not be read and were skipped.")
+        if history_user and st.button("Save to my transaction history", key="save_history"):
+            added = append_transactions(df, user_id=history_user)
+            skipped = len(df) - added
+            note = f" {skipped} row(s) were already in your history and were skipped." if skipped else ""
+            st.success(f"Saved {added} new transaction(s). Future visits will score your saved history.{note}")
+    elif history_user:
+        history_key = store_signature(history_user)
+        if history_key:
+            content_hash = f"store:{history_key}"
+            with cached_stage("app.load_history"):
+                df = load_history(content_hash, history_user)
+            st.caption(f"Scoring your saved history ({len(df)} transactions). Upload a CSV to score a new statement.")
+    if not history_user and auth_configured():
+        st.button("Sign in to save and reload your transaction history", key="sign_in", on_click=st.login)
+
+    if df is None:
         st.markdown("""
         <div style="text-align:center;padding:60px 20px;color:#3a4f6a;">
             <div style="font-size:2.5rem;margin-bottom:12px;">📂</div>
@@ -351,32 +327,36 @@ elif st.session_state.page == "dashboard":
         </div>
         """, unsafe_allow_html=True)
 
-    if uploaded_file:
-        df = pd.read_csv(uploaded_file)
-        df["date"] = pd.to_datetime(df["date"])
-        df["type"] = df["type"].str.upper()
-        df["amount"] = pd.to_numeric(df["amount"])
-
-        features = extract_features(df)
-        score = calculate_credit_score(features)
+    if df is not None:
+        aml_version = model_version()
+        results = result_store(f"{RESULTS_VERSION}:{aml_version}")
+        stored = results.get(user_email, content_hash)
+        if stored:
+            features, score = stored, stored["score"]
+        else:
+            with cached_stage("app.score"):
+                features, score = score_statement(content_hash, SCORING_VERSION, df)
+        # charts and anomaly detection run on background threads while the
+        # score and loan cards render
+        volume_job = in_background("app.volume_totals", volume_totals, content_hash, df)
+        anomaly_job = in_background("app.anomalies", detect_anomalies, content_hash, SCORING_VERSION, aml_version, df)
 
         ratio = features["credit_debit_ratio"] if "credit_debit_ratio" in features else features["total_credit"] / max(features["total_debit"], 1)
         freq = features.get("txn_frequency", len(df))
 
-        if score >= 720 and ratio > 1.2 and freq > 20:
-            risk = "Low Risk"
+        risk = assess_risk(score, ratio, freq)
+        if risk == "Low Risk":
             risk_class = "risk-low"
             risk_icon = ""
-        elif score >= 620 and ratio > 0.9:
-            risk = "Moderate Risk"
+        elif risk == "Moderate Risk":
             risk_class = "risk-medium"
             risk_icon = ""
         else:
-            risk = "High Risk"
             risk_class = "risk-high"
             risk_icon = ""
 
-        eligible = int(features["total_credit"] * 0.3)
+        eligible = eligible_amount(features)
+        rate = loan_rate(risk)
 
        
         st.markdown("""
@@ -391,6 +371,8 @@ elif st.session_state.page == "dashboard":
         c3.metric("TRANSACTIONS", len(df))
         net = features['total_credit'] - features['total_debit']
         c4.metric("NET CASHFLOW", f"₹{net:,.0f}", delta=f"{'↑' if net > 0 else '↓'} Net")
+        recent = " · ".join(f"{days}d: {calculate_credit_score(features, window=days)}" for days in DEFAULT_WINDOWS)
+        st.caption(f"Score on recent activity only — {recent}")
 
         st.markdown("<br>", unsafe_allow_html=True)
 
@@ -401,44 +383,7 @@ elif st.session_state.page == "dashboard":
         </div>
         """, unsafe_allow_html=True)
 
-        import plotly.graph_objects as go
-        col1, col2 = st.columns(2)
-        with col1:
-            st.caption("Daily Transaction Volume")
-            daily = df.groupby("date")["amount"].sum().reset_index()
-            fig1 = go.Figure()
-            fig1.add_trace(go.Scatter(
-                x=daily["date"], y=daily["amount"],
-                mode="lines+markers",
-                line=dict(color="#3b82f6", width=2),
-                marker=dict(color="#22d3ee", size=5),
-                fill="tozeroy", fillcolor="rgba(59,130,246,0.1)"
-            ))
-            fig1.update_layout(
-                paper_bgcolor="rgba(0,0,0,0)", plot_bgcolor="rgba(0,0,0,0)",
-                margin=dict(l=0,r=0,t=0,b=0), height=220,
-                xaxis=dict(showgrid=False, color="#7a90b0", tickfont=dict(size=10)),
-                yaxis=dict(showgrid=True, gridcolor="rgba(255,255,255,0.05)", color="#7a90b0", tickfont=dict(size=10)),
-                showlegend=False
-            )
-            st.plotly_chart(fig1, use_container_width=True)
-        with col2:
-            st.caption("Income vs Expense")
-            fig2 = go.Figure()
-            fig2.add_trace(go.Bar(
-                x=["Income", "Expense"],
-                y=[features['total_credit'], features['total_debit']],
-                marker_color=["#22d3ee", "#f43f5e"],
-                width=0.4
-            ))
-            fig2.update_layout(
-                paper_bgcolor="rgba(0,0,0,0)", plot_bgcolor="rgba(0,0,0,0)",
-                margin=dict(l=0,r=0,t=0,b=0), height=220,
-                xaxis=dict(showgrid=False, color="#7a90b0", tickfont=dict(size=11)),
-                yaxis=dict(showgrid=True, gridcolor="rgba(255,255,255,0.05)", color="#7a90b0", tickfont=dict(size=10)),
-                showlegend=False
-            )
-            st.plotly_chart(fig2, use_container_width=True)
+        charts = st.container()
 
 
          
@@ -451,17 +396,14 @@ elif st.session_state.page == "dashboard":
             risk_color = "#34d399"; risk_bg = "rgba(16,185,129,0.12)"; risk_border = "rgba(16,185,129,0.25)"
             verdict_icon = ""; verdict_text = "Approved for Instant Micro-Loan"
             verdict_color = "#34d399"; verdict_bg = "rgba(16,185,129,0.12)"; verdict_border = "rgba(16,185,129,0.25)"
-            rate = "14.5% p.a."
         elif risk == "Moderate Risk":
             risk_color = "#fbbf24"; risk_bg = "rgba(245,158,11,0.12)"; risk_border = "rgba(245,158,11,0.25)"
             verdict_icon = ""; verdict_text = "Eligible with Conditions"
             verdict_color = "#fbbf24"; verdict_bg = "rgba(245,158,11,0.12)"; verdict_border = "rgba(245,158,11,0.25)"
-            rate = "18.0% p.a."
         else:
             risk_color = "#f87171"; risk_bg = "rgba(239,68,68,0.12)"; risk_border = "rgba(239,68,68,0.25)"
             verdict_icon = ""; verdict_text = "Loan Not Recommended"
             verdict_color = "#f87171"; verdict_bg = "rgba(239,68,68,0.12)"; verdict_border = "rgba(239,68,68,0.25)"
-            rate = "N/A"
 
         def fbar(label, pct):
             return (
@@ -516,6 +458,49 @@ elif st.session_state.page == "dashboard":
             unsafe_allow_html=True
         )
 
+        # the score and loan cards are on screen; fill in the charts above them
+        with charts:
+            import plotly.graph_objects as go
+            col1, col2 = st.columns(2)
+            with col1:
+                resolution, volume = chart_series(collect(volume_job))
+                st.caption(f"{VOLUME_CAPTIONS[resolution]} Transaction Volume")
+                with span("app.chart.volume"):
+                    fig1 = go.Figure()
+                    fig1.add_trace(go.Scatter(
+                        x=volume.index, y=volume.to_numpy(),
+                        mode="lines+markers",
+                        line=dict(color="#3b82f6", width=2),
+                        marker=dict(color="#22d3ee", size=5),
+                        fill="tozeroy", fillcolor="rgba(59,130,246,0.1)"
+                    ))
+                    fig1.update_layout(
+                        paper_bgcolor="rgba(0,0,0,0)", plot_bgcolor="rgba(0,0,0,0)",
+                        margin=dict(l=0,r=0,t=0,b=0), height=220,
+                        xaxis=dict(showgrid=False, color="#7a90b0", tickfont=dict(size=10)),
+                        yaxis=dict(showgrid=True, gridcolor="rgba(255,255,255,0.05)", color="#7a90b0", tickfont=dict(size=10)),
+                        showlegend=False
+                    )
+                    st.plotly_chart(fig1, use_container_width=True)
+            with col2:
+                st.caption("Income vs Expense")
+                with span("app.chart.income_expense"):
+                    fig2 = go.Figure()
+                    fig2.add_trace(go.Bar(
+                        x=["Income", "Expense"],
+                        y=[features['total_credit'], features['total_debit']],
+                        marker_color=["#22d3ee", "#f43f5e"],
+                        width=0.4
+                    ))
+                    fig2.update_layout(
+                        paper_bgcolor="rgba(0,0,0,0)", plot_bgcolor="rgba(0,0,0,0)",
+                        margin=dict(l=0,r=0,t=0,b=0), height=220,
+                        xaxis=dict(showgrid=False, color="#7a90b0", tickfont=dict(size=11)),
+                        yaxis=dict(showgrid=True, gridcolor="rgba(255,255,255,0.05)", color="#7a90b0", tickfont=dict(size=10)),
+                        showlegend=False
+                    )
+                    st.plotly_chart(fig2, use_container_width=True)
+
         st.markdown("<div style='height:12px'></div>", unsafe_allow_html=True)
 
          
@@ -524,56 +509,79 @@ elif st.session_state.page == "dashboard":
             unsafe_allow_html=True
         )
 
-        from datetime import timedelta
-        mean_amt = df['amount'].mean()
-        std_amt = df['amount'].std()
-        df['z_score'] = ((df['amount'] - mean_amt) / std_amt).abs()
-        anomalies = df[df['z_score'] > 3].copy()
-
-        daily = df.groupby('date')['amount'].sum()
-        daily_mean = daily.mean()
-        daily_std = daily.std()
-        spike_dates = daily[((daily - daily_mean) / daily_std).abs() > 2].index
-
-        date_range = pd.date_range(df['date'].min(), df['date'].max())
-        active_dates = df['date'].dt.date.unique()
-        gaps = []
-        gap_start = None
-        for d in date_range:
-            if d.date() not in active_dates:
-                if gap_start is None:
-                    gap_start = d
-            else:
-                if gap_start and (d - gap_start).days >= 7:
-                    gaps.append((gap_start.date(), (d - timedelta(days=1)).date(), (d - gap_start).days))
-                gap_start = None
+        anomalies, spike_dates, gaps = collect(anomaly_job)
+        # an unverified upload is its own node: a typed email can't be linked
+        # to another user's statements
+        with span("app.counterparty_flags"):
+            flags = graph_flags(history_user or f"statement:{content_hash[:16]}", df)
+        outlier_desc = "Flagged by AML model" if aml_version else "Amounts &gt; 3x std deviation"
 
-        total_anomalies = len(anomalies) + len(spike_dates)
-        if total_anomalies == 0:
+        total_anomalies = len(anomalies) + len(spike_dates) + flags
+        a_status = anomaly_status(total_anomalies)
+        if a_status == "Clean":
             a_color = "#34d399"; a_bg = "rgba(16,185,129,0.08)"; a_border = "rgba(16,185,129,0.2)"
-            a_status = "Clean"; a_desc = "No suspicious transactions detected"
-        elif total_anomalies <= 3:
+            a_desc = "No suspicious transactions detected"
+        elif a_status == "Minor Flags":
             a_color = "#fbbf24"; a_bg = "rgba(245,158,11,0.08)"; a_border = "rgba(245,158,11,0.2)"
-            a_status = "Minor Flags"; a_desc = f"{total_anomalies} unusual pattern(s) found"
+            a_desc = f"{total_anomalies} unusual pattern(s) found"
         else:
             a_color = "#f87171"; a_bg = "rgba(239,68,68,0.08)"; a_border = "rgba(239,68,68,0.2)"
-            a_status = "High Risk"; a_desc = f"{total_anomalies} suspicious pattern(s) detected"
+            a_desc = f"{total_anomalies} suspicious pattern(s) detected"
+
+        if not stored:
+            results.put(user_email, content_hash, {
+                **features,
+                "transactions": len(df),
+                "score": score,
+                "risk": risk,
+                "eligible": eligible,
+                "rate": rate,
+                "outliers": len(anomalies),
+                "spike_days": len(spike_dates),
+                "activity_gaps": len(gaps),
+                "counterparty_flags": flags,
+                "anomaly_status": a_status,
+            })
 
         col_a1, col_a2, col_a3 = st.columns(3)
         with col_a1:
             st.markdown(f'<div style="background:{a_bg};border:1px solid {a_border};border-radius:14px;padding:16px 20px;"><div style="font-size:0.7rem;color:#7a90b0;font-family:monospace;letter-spacing:0.08em;margin-bottom:6px;">OVERALL STATUS</div><div style="font-size:1.3rem;font-weight:800;color:{a_color};">{a_status}</div><div style="font-size:0.78rem;color:#7a90b0;margin-top:4px;">{a_desc}</div></div>', unsafe_allow_html=True)
         with col_a2:
-            st.markdown(f'<div style="background:#0b1120;border:1px solid rgba(255,255,255,0.07);border-radius:14px;padding:16px 20px;"><div style="font-size:0.7rem;color:#7a90b0;font-family:monospace;letter-spacing:0.08em;margin-bottom:6px;">OUTLIER TRANSACTIONS</div><div style="font-size:1.3rem;font-weight:800;color:#e8eef8;">{len(anomalies)}</div><div style="font-size:0.78rem;color:#7a90b0;margin-top:4px;">Amounts &gt; 3x std deviation</div></div>', unsafe_allow_html=True)
+            st.markdown(f'<div style="background:#0b1120;border:1px solid rgba(255,255,255,0.07);border-radius:14px;padding:16px 20px;"><div style="font-size:0.7rem;color:#7a90b0;font-family:monospace;letter-spacing:0.08em;margin-bottom:6px;">OUTLIER TRANSACTIONS</div><div style="font-size:1.3rem;font-weight:800;color:#e8eef8;">{len(anomalies)}</div><div style="font-size:0.78rem;color:#7a90b0;margin-top:4px;">{outlier_desc}</div></div>', unsafe_allow_html=True)
         with col_a3:
             st.markdown(f'<div style="background:#0b1120;border:1px solid rgba(255,255,255,0.07);border-radius:14px;padding:16px 20px;"><div style="font-size:0.7rem;color:#7a90b0;font-family:monospace;letter-spacing:0.08em;margin-bottom:6px;">ACTIVITY GAPS</div><div style="font-size:1.3rem;font-weight:800;color:#e8eef8;">{len(gaps)}</div><div style="font-size:0.78rem;color:#7a90b0;margin-top:4px;">Periods &gt; 7 days inactive</div></div>', unsafe_allow_html=True)
 
         if len(anomalies) > 0:
             st.markdown("<div style='height:8px'></div>", unsafe_allow_html=True)
             with st.expander(f"View {len(anomalies)} Flagged Transaction(s)"):
-                st.dataframe(anomalies[['date','type','amount','z_score']].rename(columns={'z_score':'anomaly_score'}).round(2), use_container_width=True)
+                with span("app.table.flagged"):
+                    transaction_viewer("flagged", anomalies[['date','type','amount','z_score']].rename(columns={'z_score':'anomaly_score'}).round(2))
 
         st.markdown("<div style='height:12px'></div>", unsafe_allow_html=True)
 
          
         with st.expander("View Raw Transaction Data"):
-            st.dataframe(df.drop(columns=['z_score'], errors='ignore'), use_container_width=True)
+            with span("app.table.raw"):
+                transaction_viewer("raw", df)
+
+
+if DEBUG:
+    with st.expander("Performance (debug)"):
+        spans = run_spans()
+        if spans:
+            st.caption("This run (nested spans also count toward their parent)")
+            st.dataframe(
+                pd.DataFrame(spans, columns=["stage", "seconds"]).assign(ms=lambda t: (t["seconds"] * 1000).round(2)).drop(columns="seconds"),
+                use_container_width=True,
+            )
+        totals = snapshot()["stages"]
+        if totals:
+            st.caption("Process totals")
+            st.dataframe(
+                pd.DataFrame.from_dict(totals, orient="index").sort_values("seconds", ascending=False),
+                use_container_width=True,
+            )
+        st.code(prometheus_text(), language="text")
+
+if METRICS_FILE:
+    write_prometheus(METRICS_FILE)
@@ -0,0 +1,184 @@
+import argparse
+import glob
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from udaancredit.aml import model_version
+from udaancredit.anomalies import anomaly_status
+from udaancredit.graph import CounterpartyGraph
+from udaancredit.ingest import peek_columns, read_statement
+from udaancredit.pipeline import RESULT_COLUMNS, score_transactions, timed
+from udaancredit.results import RESULTS_VERSION, ResultStore, content_hashes, file_hash
+
+
+def find_statements(inputs):
+    paths = []
+    for item in inputs:
+        if os.path.isdir(item):
+            paths.extend(sorted(glob.glob(os.path.join(item, "*.csv"))))
+        else:
+            paths.extend(sorted(glob.glob(item)) or [item])
+    return paths
+
+
+def _score_file(path):
+    timings = {}
+    try:
+        with timed(timings, "parse"):
+            df, quarantine = read_statement(path)
+        row = score_transactions(df, timings)
+        row.update(source=path, quarantined=len(quarantine), error=None)
+        return [row], timings, len(df)
+    except Exception as e:
+        return [{"source": path, "error": f"{type(e).__name__}: {e}"}], timings, 0
+
+
+def _score_users(df, user_col, flags):
+    timings = {}
+    rows = []
+    for user, user_df in df.groupby(user_col, sort=False):
+        row = score_transactions(user_df.reset_index(drop=True), timings, flags.get(str(user), 0))
+        row[user_col] = user
+        rows.append(row)
+    return rows, timings, len(df)
+
+
+def _merge_timings(total, timings):
+    for stage, seconds in timings.items():
+        total[stage] = total.get(stage, 0.0) + seconds
+
+
+def score_files(paths, workers=None, store=None):
+    # with a result store, files whose content was already scored under the
+    # current scoring version are read back instead of re-parsed
+    rows, timings, n_rows = [], {}, 0
+    pending, reused = paths, 0
+    if store is not None:
+        with timed(timings, "lookup"):
+            hashes = {path: file_hash(path) for path in paths if os.path.isfile(path)}
+            stored = store.get_many((path, content_hash) for path, content_hash in hashes.items())
+        rows = [{**stored[path, hashes[path]], "source": path} for path in paths if (path, hashes.get(path)) in stored]
+        pending = [path for path in paths if (path, hashes.get(path)) not in stored]
+        reused = len(rows)
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        for file_rows, file_timings, file_n in pool.map(_score_file, pending, chunksize=8):
+            rows.extend(file_rows)
+            _merge_timings(timings, file_timings)
+            n_rows += file_n
+    if store is not None:
+        with timed(timings, "store"):
+            store.put_many((row["source"], hashes[row["source"]], row) for row in rows[reused:] if row["error"] is None)
+    results = pd.DataFrame(rows, columns=["source", *RESULT_COLUMNS, "quarantined", "error"])
+    return results, timings, n_rows, reused
+
+
+def score_multi_user_file(path, user_col="user_id", workers=None, store=None):
+    timings = {}
+    with timed(timings, "parse"):
+        df, quarantine = read_statement(path, extra_columns=[user_col])
+    workers = workers or os.cpu_count() or 1
+
+    # one graph over every user, so round trips between users in the file are
+    # seen; flags depend on other users' rows, so reused results get them too
+    with timed(timings, "graph"):
+        graph = CounterpartyGraph()
+        graph.add(df, user_col=user_col)
+        flags = graph.user_flags()["counterparty_flags"].to_dict()
+
+    rows = []
+    if store is not None:
+        with timed(timings, "lookup"):
+            hashes = content_hashes(df, user_col)
+            stored = store.get_many(hashes.items())
+        for user, content_hash in hashes.items():
+            if (str(user), content_hash) in stored:
+                row = {**stored[str(user), content_hash], user_col: user, "counterparty_flags": flags.get(str(user), 0)}
+                row["anomaly_status"] = anomaly_status(row["outliers"] + row["spike_days"] + row["counterparty_flags"])
+                rows.append(row)
+        done = {row[user_col] for row in rows}
+        todo = df[~df[user_col].isin(done)]
+    else:
+        todo = df
+    reused = len(rows)
+
+    # spread users over more parts than workers so heavy users even out
+    codes, _ = pd.factorize(todo[user_col], sort=False)
+    buckets = codes % (workers * 4)
+    parts = [todo[buckets == b] for b in np.unique(buckets)]
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [
+            pool.submit(_score_users, part, user_col, {str(user): flags.get(str(user), 0) for user in part[user_col].unique()})
+            for part in parts
+        ]
+        for future in futures:
+            part_rows, part_timings, _ = future.result()
+            rows.extend(part_rows)
+            _merge_timings(timings, part_timings)
+    if store is not None:
+        with timed(timings, "store"):
+            store.put_many((row[user_col], hashes[row[user_col]], row) for row in rows[reused:])
+    results = pd.DataFrame(rows, columns=[user_col, *RESULT_COLUMNS])
+    return results, timings, len(df), len(quarantine), reused
+
+
+def write_results(results, output):
+    if output.endswith(".parquet"):
+        results.to_parquet(output, index=False)
+    else:
+        results.to_csv(output, index=False)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Score UPI statements without the dashboard.")
+    parser.add_argument("inputs", nargs="+", help="statement CSVs, directories or glob patterns")
+    parser.add_argument("-o", "--output", default="scores.csv", help="results file (.csv or .parquet)")
+    parser.add_argument("-w", "--workers", type=int, default=None, help="worker processes (default: all cores)")
+    parser.add_argument("--user-col", default="user_id", help="user column for multi-user files")
+    parser.add_argument("--results", metavar="PATH",
+                        help="persistent result store (SQLite); unchanged statements are not rescored")
+    args = parser.parse_args(argv)
+
+    paths = find_statements(args.inputs)
+    if not paths:
+        parser.error("no statement files found")
+
+    start = time.perf_counter()
+    # the AML model is part of the key, as on the dashboard, so retraining it
+    # invalidates stored outlier counts
+    store = ResultStore(args.results, version=f"{RESULTS_VERSION}:{model_version()}") if args.results else None
+    multi_user = len(paths) == 1 and args.user_col in peek_columns(paths[0])
+    if multi_user:
+        results, timings, n_rows, n_quarantined, reused = score_multi_user_file(
+            paths[0], args.user_col, args.workers, store)
+    else:
+        results, timings, n_rows, reused = score_files(paths, args.workers, store)
+        n_quarantined = int(results["quarantined"].fillna(0).sum())
+    elapsed = time.perf_counter() - start
+
+    with timed(timings, "write"):
+        write_results(results, args.output)
+
+    report = sys.stderr
+    print(f"scored {len(results)} {'users' if multi_user else 'statements'} "
+          f"({n_rows} rows, {n_quarantined} quarantined) in {elapsed:.2f}s -> {args.output}", file=report)
+    print(f"  {n_rows / elapsed:,.0f} rows/sec, {len(paths) / elapsed:,.2f} files/sec", file=report)
+    if store is not None:
+        print(f"  {reused} result(s) reused from {args.results}", file=report)
+    if not multi_user:
+        failed = int(results["error"].notna().sum())
+        if failed:
+            print(f"  {failed} file(s) failed, see the error column", file=report)
+    print("  stage time (summed across workers):", file=report)
+    for stage, seconds in sorted(timings.items(), key=lambda item: -item[1]):
+        print(f"    {stage:<10} {seconds:8.3f}s", file=report)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,179 @@
+import argparse
+import gc
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+
+import synthetic
+from udaancredit import compact
+from udaancredit.anomalies import amount_outliers, daily_volume, find_activity_gaps, find_activity_gaps_by_user, spike_days
+from udaancredit.features import extract_features, extract_features_by_user, feature_dicts
+from udaancredit.ingest import read_statement
+from udaancredit.parallel import population_run
+from udaancredit.scoring import calculate_credit_score, calculate_credit_scores
+
+RESULTS_DIR = os.path.join("benchmarks", "results")
+BASELINE_PATH = os.path.join("benchmarks", "baseline.json")
+DEFAULT_SCALES = [1_000, 10_000, 100_000, 1_000_000]
+SCALAR_SCORE_SAMPLE = 10_000
+# absolute slack so sub-millisecond stages don't fail on timer noise
+NOISE_FLOOR = {"seconds": 0.005, "peak_mb": 1.0}
+
+
+def measure(fn, repeat=3):
+    # best wall time over `repeat` runs, and peak traced allocation of one run
+    gc.collect()
+    tracemalloc.start()
+    result = fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return result, best, peak
+
+
+def bench_scale(rows, repeat, workdir, workers=()):
+    stages = {}
+
+    def record(name, fn, n):
+        result, seconds, peak = measure(fn, repeat)
+        stages[name] = {
+            "seconds": seconds,
+            "rows_per_sec": n / seconds if seconds > 0 else None,
+            "peak_mb": peak / 2**20,
+        }
+        return result
+
+    path = os.path.join(workdir, f"synthetic_{rows}.csv")
+    synthetic.write_csv(path, rows)
+
+    df, _ = record("ingest", lambda: read_statement(path), rows)
+    n = len(df)
+    record("extract_features", lambda: extract_features(df), n)
+    features = record("extract_features_by_user", lambda: extract_features_by_user(df), n)
+    record("score_batch", lambda: calculate_credit_scores(features), len(features))
+    sample = [feats for _, feats in feature_dicts(features.head(SCALAR_SCORE_SAMPLE))]
+    record("score_scalar", lambda: [calculate_credit_score(f) for f in sample], len(sample))
+    record("zscore_outliers", lambda: amount_outliers(df), n)
+    record("zscore_outliers_by_user",
+           lambda: amount_outliers(df, by=["user_id", "type"], method="robust"), n)
+    record("daily_spikes", lambda: spike_days(daily_volume(df)), n)
+    record("daily_spikes_by_user",
+           lambda: spike_days(daily_volume(df, ["user_id"]), by=["user_id"]), n)
+    record("activity_gaps", lambda: find_activity_gaps(df["date"]), n)
+    record("activity_gaps_by_user", lambda: find_activity_gaps_by_user(df), n)
+
+    packed = record("compact_convert", lambda: compact.from_frame(df), n)
+    record("compact_features_by_user", lambda: compact.features_by_user(packed), n)
+    record("compact_zscore_outliers", lambda: compact.outlier_rows(packed), n)
+    record("compact_daily_spikes", lambda: spike_days(compact.daily_volume(packed)), n)
+    # same work as the *_by_user stages above, over shared memory; compare
+    # population_w1 with population_wN for multi-core scaling
+    for count in workers:
+        record(f"population_w{count}", lambda: population_run(df, workers=count), n)
+    memory = {
+        "frame_mb": df.memory_usage(deep=True).sum() / 2**20,
+        "compact_mb": packed.nbytes / 2**20,
+    }
+    os.remove(path)
+    return {"rows": n, "users": len(features), "stages": stages, "memory": memory}
+
+
+def compare(results, baseline, tolerance):
+    # a stage regresses when it is more than `tolerance` slower (or larger) than
+    # the baseline at the same scale, beyond the noise floor
+    regressions = []
+    for scale, current in results["scales"].items():
+        base = baseline["scales"].get(scale)
+        if base is None:
+            continue
+        for stage, now in current["stages"].items():
+            before = base["stages"].get(stage)
+            if before is None:
+                continue
+            for metric in ("seconds", "peak_mb"):
+                allowed = max(before[metric] * tolerance, NOISE_FLOOR[metric])
+                if before[metric] and now[metric] > before[metric] + allowed:
+                    regressions.append(
+                        f"{scale} rows / {stage}: {metric} {before[metric]:.4g} -> {now[metric]:.4g} "
+                        f"(+{now[metric] / before[metric] - 1:.0%})"
+                    )
+    return regressions
+
+
+def print_results(results, out=sys.stdout):
+    for scale, result in results["scales"].items():
+        print(f"{scale} rows ({result['rows']} generated, {result['users']} users)", file=out)
+        for stage, m in result["stages"].items():
+            rate = f"{m['rows_per_sec']:>14,.0f} rows/s" if m["rows_per_sec"] else ""
+            print(f"  {stage:<26} {m['seconds'] * 1000:>10.2f} ms {rate} {m['peak_mb']:>9.1f} MB", file=out)
+        memory = result.get("memory")
+        if memory:
+            print(f"  resident: DataFrame {memory['frame_mb']:.1f} MB, compact {memory['compact_mb']:.1f} MB "
+                  f"({memory['frame_mb'] / max(memory['compact_mb'], 1e-9):.1f}x smaller)", file=out)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark each pipeline stage on synthetic UPI data.")
+    parser.add_argument("--scales", type=int, nargs="+", default=DEFAULT_SCALES,
+                        help="row counts to benchmark (up to 100M; large scales need the memory)")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--baseline", default=BASELINE_PATH)
+    parser.add_argument("--save-baseline", action="store_true", help="store these results as the baseline")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed slowdown before failing")
+    parser.add_argument("--workers", type=int, nargs="+", default=sorted({1, os.cpu_count() or 1}),
+                        help="worker counts for the shared-memory population run")
+    args = parser.parse_args(argv)
+
+    results = {
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "machine": platform.machine(),
+        "cpus": os.cpu_count(),
+        "scales": {},
+    }
+    with tempfile.TemporaryDirectory() as workdir:
+        for rows in args.scales:
+            results["scales"][str(rows)] = bench_scale(rows, args.repeat, workdir, args.workers)
+    print_results(results)
+
+    os.makedirs(RESULTS_DIR, exist_ok=True)
+    path = os.path.join(RESULTS_DIR, f"{time.strftime('%Y%m%d-%H%M%S')}.json")
+    with open(path, "w") as f:
+        json.dump(results, f, indent=2)
+    print(f"results written to {path}")
+
+    if args.save_baseline:
+        os.makedirs(os.path.dirname(args.baseline) or ".", exist_ok=True)
+        with open(args.baseline, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"baseline written to {args.baseline}")
+        return 0
+
+    if not os.path.exists(args.baseline):
+        print("no baseline to compare against; run with --save-baseline")
+        return 0
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    regressions = compare(results, baseline, args.tolerance)
+    if regressions:
+        print(f"REGRESSIONS vs {args.baseline}:", file=sys.stderr)
+        for line in regressions:
+            print(f"  {line}", file=sys.stderr)
+        return 1
+    print(f"no regressions vs {args.baseline} (tolerance {args.tolerance:.0%})")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,57 @@
+import argparse
+import os
+import subprocess
+import sys
+import time
+
+# modules the headless core must not pull in at import time
+HEAVY_MODULES = ["streamlit", "plotly", "sklearn", "matplotlib", "joblib", "aiohttp"]
+DEFAULT_BUDGET_SECONDS = 1.5
+ROOT = os.path.dirname(os.path.abspath(__file__))
+
+_PROBE = """
+import sys, time
+start = time.perf_counter()
+import udaancredit
+elapsed = time.perf_counter() - start
+print(elapsed)
+print(",".join(m for m in {heavy!r} if m in sys.modules))
+"""
+
+
+def measure_import(repeat=3):
+    # each run is a fresh interpreter, so this is the cold-start cost a batch
+    # worker or new app replica pays
+    best, loaded = float("inf"), []
+    for _ in range(repeat):
+        out = subprocess.run(
+            [sys.executable, "-c", _PROBE.format(heavy=HEAVY_MODULES)],
+            capture_output=True, text=True, check=True, cwd=ROOT,
+        ).stdout.splitlines()
+        best = min(best, float(out[0]))
+        loaded = [m for m in out[1].split(",") if m]
+    return best, loaded
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Check the cold-start import budget of the udaancredit core.")
+    parser.add_argument("--budget", type=float, default=DEFAULT_BUDGET_SECONDS, help="seconds")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    seconds, loaded = measure_import(args.repeat)
+    print(f"import udaancredit: {seconds * 1000:.0f} ms (budget {args.budget * 1000:.0f} ms, "
+          f"checked in {time.perf_counter() - start:.1f}s)")
+    failed = False
+    if loaded:
+        print(f"FAIL: heavy modules imported eagerly: {', '.join(loaded)}", file=sys.stderr)
+        failed = True
+    if seconds > args.budget:
+        print("FAIL: import time over budget", file=sys.stderr)
+        failed = True
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,2 @@
+# keeps the repo root on sys.path, so plain `pytest` can import udaancredit and
+# the root scripts the same way `python -m pytest` does
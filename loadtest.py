@@ -0,0 +1,83 @@
+import argparse
+import asyncio
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import aiohttp
+import numpy as np
+
+
+def random_features(rng):
+    inflow = rng.randint(0, 40)
+    outflow = rng.randint(0, 40)
+    total_credit = rng.uniform(0, 30000)
+    return {
+        "total_credit": total_credit,
+        "total_debit": rng.uniform(0, 30000),
+        "inflow_count": inflow,
+        "outflow_count": outflow,
+        "avg_ticket_size": total_credit / inflow if inflow else 0,
+        "cashflow_stability": inflow / max(outflow, 1),
+    }
+
+
+async def _worker(session, url, deadline, latencies, errors, seed):
+    rng = random.Random(seed)
+    while time.perf_counter() < deadline:
+        payload = {"features": random_features(rng)}
+        start = time.perf_counter()
+        try:
+            async with session.post(url, json=payload) as response:
+                await response.read()
+                if response.status != 200:
+                    errors.append(response.status)
+        except aiohttp.ClientError as e:
+            errors.append(str(e))
+        latencies.append(time.perf_counter() - start)
+
+
+async def run(url, concurrency, duration, seed=0):
+    latencies, errors = [], []
+    connector = aiohttp.TCPConnector(limit=concurrency)
+    async with aiohttp.ClientSession(connector=connector) as session:
+        start = time.perf_counter()
+        deadline = start + duration
+        await asyncio.gather(*(
+            _worker(session, url, deadline, latencies, errors, seed * concurrency + i)
+            for i in range(concurrency)
+        ))
+        elapsed = time.perf_counter() - start
+    return latencies, errors, elapsed
+
+
+def _run_process(args):
+    return asyncio.run(run(*args))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Load-test the scoring service's /score endpoint.")
+    parser.add_argument("--url", default="http://127.0.0.1:8080/score")
+    parser.add_argument("-c", "--concurrency", type=int, default=256)
+    parser.add_argument("-d", "--duration", type=float, default=10.0, help="seconds")
+    parser.add_argument("-p", "--processes", type=int, default=1,
+                        help="client processes, each with --concurrency connections")
+    args = parser.parse_args(argv)
+
+    jobs = [(args.url, args.concurrency, args.duration, seed) for seed in range(args.processes)]
+    with ProcessPoolExecutor(max_workers=args.processes) as pool:
+        results = list(pool.map(_run_process, jobs))
+    latencies = [latency for result in results for latency in result[0]]
+    errors = [error for result in results for error in result[1]]
+    elapsed = max(result[2] for result in results)
+    if not latencies:
+        print("no requests completed")
+        return
+    p50, p99 = np.percentile(latencies, [50, 99]) * 1000
+    print(f"{len(latencies)} requests in {elapsed:.1f}s with {args.processes * args.concurrency} connections")
+    print(f"  throughput {len(latencies) / elapsed:,.0f} req/s, errors {len(errors)}")
+    print(f"  latency p50 {p50:.2f} ms, p99 {p99:.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,307 @@
+import argparse
+import asyncio
+import threading
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+from aiohttp import web
+
+from udaancredit.aml import model_outliers, model_version
+from udaancredit.anomalies import amount_outliers, anomaly_status, daily_volume, find_activity_gaps, spike_days
+from udaancredit.features import extract_features
+from udaancredit.graph import CounterpartyGraph, counterparty_flags
+from udaancredit.ingest import read_records, read_statement
+from udaancredit.scoring import (
+    LOAN_RATES,
+    SCORE_FEATURES,
+    assess_risks,
+    calculate_credit_scores,
+    credit_debit_ratios,
+    eligible_amounts,
+)
+
+MAX_BATCH = 1024
+MAX_WAIT_SECONDS = 0.002
+LATENCY_WINDOW = 20_000
+THROUGHPUT_WINDOW_SECONDS = 10
+REQUIRED_FEATURES = SCORE_FEATURES + ["total_debit"]
+
+
+class RejectedRows(ValueError):
+    # rows the ingest validation quarantined; the handlers answer 400 with them
+
+    def __init__(self, message, rows):
+        super().__init__(message, rows)
+        self.rows = rows
+
+
+def _transactions_frame(payload):
+    # JSON rows and CSV bodies share the ingest validation; a payload with any
+    # rejected row is refused rather than scored on the rows that were left
+    if "csv" in payload:
+        df, quarantine = read_statement(payload["csv"].encode())
+    else:
+        df, quarantine = read_records(payload["transactions"])
+    if len(quarantine):
+        rows = quarantine.astype(object).where(quarantine.notna(), None).to_dict("records")
+        raise RejectedRows(f"{len(rows)} transaction(s) could not be read", rows)
+    if df.empty:
+        raise ValueError("no transactions")
+    return df
+
+
+def prepare_features(payload):
+    # runs in the worker pool: raw transactions -> the feature row the batcher scores
+    df = _transactions_frame(payload)
+    features = extract_features(df)
+    return {name: float(features[name]) for name in REQUIRED_FEATURES} | {"transactions": len(df)}
+
+
+def detect_payload_anomalies(payload):
+    # runs in the worker pool; counterparty flags need the service's graph, so
+    # the parsed frame comes back for payload_flags to add in this process
+    df = _transactions_frame(payload)
+    outliers = model_outliers(df) if model_version() else amount_outliers(df)
+    spikes = spike_days(daily_volume(df))
+    gaps = find_activity_gaps(df["date"])
+    result = {
+        "outliers": [
+            {"date": str(row.date.date()), "type": str(row.type), "amount": float(row.amount),
+             "anomaly_score": round(float(row.z_score), 2)}
+            for row in outliers.itertuples()
+        ],
+        "spike_days": [str(d.date()) for d in spikes],
+        "activity_gaps": [
+            {"start": str(start), "end": str(end), "days": days} for start, end, days in gaps
+        ],
+    }
+    return result, df
+
+
+def payload_flags(app, payload, df):
+    # with a user_id the statement joins the service's graph, so round trips
+    # with other users' statements count; without one it is checked alone
+    if payload.get("user_id") is None:
+        return counterparty_flags(df)
+    with app["graph_lock"]:
+        return counterparty_flags(df, user_id=str(payload["user_id"]), graph=app["graph"])
+
+
+def score_batch(rows):
+    columns = {name: np.fromiter((r[name] for r in rows), float, len(rows)) for name in REQUIRED_FEATURES}
+    txn_counts = np.fromiter((r["transactions"] for r in rows), float, len(rows))
+    scores = calculate_credit_scores(columns)
+    ratios = credit_debit_ratios(columns["total_credit"], columns["total_debit"])
+    risks = assess_risks(scores, ratios, txn_counts)
+    eligible = eligible_amounts(columns["total_credit"])
+    return [
+        {"score": int(s), "risk": r, "eligible": int(e), "rate": LOAN_RATES[r]}
+        for s, r, e in zip(scores, risks, eligible)
+    ]
+
+
+class MicroBatcher:
+    # coalesces concurrent submissions into one call of fn(list_of_items)
+
+    def __init__(self, fn, max_batch=MAX_BATCH, max_wait=MAX_WAIT_SECONDS):
+        self.fn = fn
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self.queue = asyncio.Queue()
+        self.batches = 0
+        self.items = 0
+        self._task = None
+
+    def start(self):
+        self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+
+    async def submit(self, item):
+        future = asyncio.get_running_loop().create_future()
+        self.queue.put_nowait((item, future))
+        return await future
+
+    def _drain(self, batch):
+        while len(batch) < self.max_batch and not self.queue.empty():
+            batch.append(self.queue.get_nowait())
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self.queue.get()]
+            self._drain(batch)
+            if len(batch) < self.max_batch and self.max_wait > 0:
+                await asyncio.sleep(self.max_wait)
+                self._drain(batch)
+            items = [item for item, _ in batch]
+            try:
+                results = await loop.run_in_executor(None, self.fn, items)
+            except Exception as e:
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+            self.batches += 1
+            self.items += len(items)
+            for (_, future), result in zip(batch, results):
+                if not future.done():
+                    future.set_result(result)
+
+
+class Metrics:
+    def __init__(self):
+        self.started = time.monotonic()
+        self.latencies = {}
+        self.completed = deque(maxlen=LATENCY_WINDOW)
+        self.counts = {}
+        self.errors = {}
+
+    def observe(self, route, seconds, ok):
+        self.latencies.setdefault(route, deque(maxlen=LATENCY_WINDOW)).append(seconds)
+        self.counts[route] = self.counts.get(route, 0) + 1
+        if not ok:
+            self.errors[route] = self.errors.get(route, 0) + 1
+        self.completed.append(time.monotonic())
+
+    def snapshot(self):
+        now = time.monotonic()
+        recent = sum(1 for t in self.completed if now - t <= THROUGHPUT_WINDOW_SECONDS)
+        routes = {}
+        for route, samples in self.latencies.items():
+            p50, p99 = np.percentile(np.fromiter(samples, float), [50, 99]) * 1000
+            routes[route] = {
+                "requests": self.counts[route],
+                "errors": self.errors.get(route, 0),
+                "p50_ms": round(float(p50), 3),
+                "p99_ms": round(float(p99), 3),
+            }
+        window = min(THROUGHPUT_WINDOW_SECONDS, now - self.started)
+        return {
+            "uptime_seconds": round(now - self.started, 1),
+            "requests_per_second": round(recent / window, 1) if window > 0 else 0.0,
+            "routes": routes,
+        }
+
+
+@web.middleware
+async def metrics_middleware(request, handler):
+    start = time.perf_counter()
+    ok = False
+    try:
+        response = await handler(request)
+        ok = response.status < 400
+        return response
+    finally:
+        # keyed by route, not path, so unknown URLs can't grow the table
+        resource = request.match_info.route.resource
+        route = resource.canonical if resource is not None else "unmatched"
+        request.app["metrics"].observe(route, time.perf_counter() - start, ok)
+
+
+async def _json_payload(request):
+    if request.content_type == "text/csv":
+        return {"csv": await request.text()}
+    try:
+        payload = await request.json()
+    except ValueError:
+        raise web.HTTPBadRequest(text='{"error": "invalid JSON"}', content_type="application/json")
+    if not isinstance(payload, dict):
+        raise web.HTTPBadRequest(text='{"error": "expected a JSON object"}', content_type="application/json")
+    return payload
+
+
+def _bad_request(message, **details):
+    return web.json_response({"error": message, **details}, status=400)
+
+
+async def handle_score(request):
+    payload = await _json_payload(request)
+    loop = asyncio.get_running_loop()
+    try:
+        if "features" in payload:
+            features = payload["features"]
+            row = {name: float(features[name]) for name in REQUIRED_FEATURES}
+            row["transactions"] = float(
+                features.get("transactions", row["inflow_count"] + row["outflow_count"])
+            )
+        elif "transactions" in payload or "csv" in payload:
+            row = await loop.run_in_executor(request.app["pool"], prepare_features, payload)
+        else:
+            return _bad_request("expected 'features', 'transactions' or a text/csv body")
+    except RejectedRows as e:
+        return _bad_request(e.args[0], rejected=e.rows)
+    except (KeyError, TypeError, ValueError) as e:
+        return _bad_request(f"invalid payload: {e}")
+    result = await request.app["batcher"].submit(row)
+    return web.json_response(result)
+
+
+async def handle_anomalies(request):
+    payload = await _json_payload(request)
+    if "transactions" not in payload and "csv" not in payload:
+        return _bad_request("expected 'transactions' or a text/csv body")
+    loop = asyncio.get_running_loop()
+    try:
+        result, df = await loop.run_in_executor(request.app["pool"], detect_payload_anomalies, payload)
+    except RejectedRows as e:
+        return _bad_request(e.args[0], rejected=e.rows)
+    except (KeyError, TypeError, ValueError) as e:
+        return _bad_request(f"invalid payload: {e}")
+    flags = await loop.run_in_executor(None, payload_flags, request.app, payload, df)
+    result["counterparty_flags"] = flags
+    result["status"] = anomaly_status(len(result["outliers"]) + len(result["spike_days"]) + flags)
+    return web.json_response(result)
+
+
+async def handle_stats(request):
+    stats = request.app["metrics"].snapshot()
+    batcher = request.app["batcher"]
+    stats["batches"] = batcher.batches
+    stats["mean_batch_size"] = round(batcher.items / batcher.batches, 1) if batcher.batches else 0.0
+    return web.json_response(stats)
+
+
+def create_app(workers=None, max_batch=MAX_BATCH, max_wait=MAX_WAIT_SECONDS):
+    app = web.Application(middlewares=[metrics_middleware])
+    app["metrics"] = Metrics()
+    # counterparty graph over every statement sent with a user_id
+    app["graph"] = CounterpartyGraph(dedupe=True)
+    app["graph_lock"] = threading.Lock()
+
+    async def on_startup(app):
+        app["pool"] = ProcessPoolExecutor(max_workers=workers)
+        app["batcher"] = MicroBatcher(score_batch, max_batch, max_wait)
+        app["batcher"].start()
+
+    async def on_cleanup(app):
+        await app["batcher"].stop()
+        app["pool"].shutdown(cancel_futures=True)
+
+    app.on_startup.append(on_startup)
+    app.on_cleanup.append(on_cleanup)
+    app.router.add_post("/score", handle_score)
+    app.router.add_post("/anomalies", handle_anomalies)
+    app.router.add_get("/stats", handle_stats)
+    return app
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Local UdaanCredit scoring service.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("-w", "--workers", type=int, default=None, help="worker processes (default: all cores)")
+    parser.add_argument("--max-batch", type=int, default=MAX_BATCH)
+    parser.add_argument("--max-wait-ms", type=float, default=MAX_WAIT_SECONDS * 1000)
+    args = parser.parse_args(argv)
+    app = create_app(args.workers, args.max_batch, args.max_wait_ms / 1000)
+    web.run_app(app, host=args.host, port=args.port, access_log=None)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+import argparse
+
+import numpy as np
+import pandas as pd
+
+PATTERNS = ["daily", "weekly", "monthly"]
+PATTERN_WEIGHTS = [0.6, 0.3, 0.1]
+CREDIT_SHARE = 0.55
+USERS_PER_CHUNK = 20_000
+
+
+def generate_transactions(n_users=100, days=180, start="2025-01-01", seed=0, txns_per_day=2.0,
+                          spike_rate=0.002, gap_rate=0.2, user_offset=0):
+    # deterministic synthetic UPI history for n_users: per-user income level,
+    # activity rate and pay pattern (daily wages, weekly or monthly credits),
+    # plus injected amount spikes and 7-30 day inactivity gaps
+    rng = np.random.default_rng([seed, user_offset])
+    income = rng.lognormal(6.3, 0.7, n_users)
+    activity = rng.gamma(2.0, txns_per_day / 2.0, n_users)
+    pattern = rng.choice(len(PATTERNS), n_users, p=PATTERN_WEIGHTS)
+    payday = rng.integers(0, 28, n_users)
+
+    counts = rng.poisson(activity * days)
+    user = np.repeat(np.arange(n_users), counts)
+    n = len(user)
+    day = rng.integers(0, days, n)
+    credit = rng.random(n) < CREDIT_SHARE
+
+    # weekly / monthly earners get their credits on a fixed payday
+    weekly = credit & (pattern[user] == 1)
+    day[weekly] = day[weekly] - day[weekly] % 7 + payday[user[weekly]] % 7
+    monthly = credit & (pattern[user] == 2)
+    day[monthly] = day[monthly] - day[monthly] % 30 + payday[user[monthly]]
+    day = np.clip(day, 0, days - 1)
+
+    amount = np.where(
+        credit,
+        rng.lognormal(np.log(income[user]), 0.5),
+        rng.lognormal(np.log(income[user] * 0.7), 0.6),
+    )
+    spikes = rng.random(n) < spike_rate
+    amount[spikes] *= rng.uniform(10, 50, spikes.sum())
+
+    has_gap = rng.random(n_users) < gap_rate
+    gap_start = rng.integers(0, max(days - 7, 1), n_users)
+    gap_length = rng.integers(7, 31, n_users)
+    in_gap = has_gap[user] & (day >= gap_start[user]) & (day < gap_start[user] + gap_length[user])
+    keep = ~in_gap
+
+    df = pd.DataFrame({
+        "user_id": user[keep] + user_offset,
+        "date": pd.Timestamp(start) + pd.to_timedelta(day[keep], unit="D"),
+        "type": pd.Categorical.from_codes(np.where(credit[keep], 0, 1), ["CREDIT", "DEBIT"]),
+        "amount": np.round(amount[keep], 2),
+    })
+    return df.sort_values(["user_id", "date"], kind="stable").reset_index(drop=True)
+
+
+def users_for_rows(rows, days=180, txns_per_day=2.0):
+    return max(1, int(round(rows / (days * txns_per_day))))
+
+
+def iter_transactions(rows, days=180, seed=0, txns_per_day=2.0, users_per_chunk=USERS_PER_CHUNK, **kwargs):
+    # yields generated chunks of users until roughly `rows` transactions exist;
+    # each chunk is seeded by its first user id, so output is deterministic
+    n_users = users_for_rows(rows, days, txns_per_day)
+    for offset in range(0, n_users, users_per_chunk):
+        yield generate_transactions(
+            min(users_per_chunk, n_users - offset), days, seed=seed,
+            txns_per_day=txns_per_day, user_offset=offset, **kwargs,
+        )
+
+
+def write_csv(path, rows, days=180, seed=0, **kwargs):
+    written = 0
+    for i, chunk in enumerate(iter_transactions(rows, days, seed, **kwargs)):
+        chunk.to_csv(path, mode="w" if i == 0 else "a", header=i == 0, index=False, date_format="%Y-%m-%d")
+        written += len(chunk)
+    return written
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Write a synthetic multi-user UPI statement CSV.")
+    parser.add_argument("output")
+    parser.add_argument("-n", "--rows", type=int, default=100_000, help="approximate number of transactions")
+    parser.add_argument("--days", type=int, default=180, help="history length")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--spike-rate", type=float, default=0.002)
+    parser.add_argument("--gap-rate", type=float, default=0.2)
+    args = parser.parse_args(argv)
+    written = write_csv(args.output, args.rows, args.days, args.seed,
+                        spike_rate=args.spike_rate, gap_rate=args.gap_rate)
+    print(f"wrote {written} transactions to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,54 @@
+import os
+
+import joblib
+import numpy as np
+import pandas as pd
+import pytest
+
+from udaancredit.aml import MODEL_FEATURES, load_detector, model_outliers, model_scores, model_version, train_detector
+
+
+@pytest.fixture
+def transactions():
+    rng = np.random.default_rng(0)
+    n = 400
+    return pd.DataFrame({
+        "user_id": rng.choice(["a", "b", "c"], size=n),
+        "date": pd.Timestamp("2025-01-01") + pd.to_timedelta(rng.integers(0, 90, size=n), unit="D"),
+        "type": rng.choice(["CREDIT", "DEBIT"], size=n),
+        "amount": rng.lognormal(6, 1, size=n).round(2),
+    })
+
+
+def test_scores_use_the_grouping_the_model_was_trained_with(transactions, tmp_path):
+    path = str(tmp_path / "model.joblib")
+    train_detector(transactions, path, by=["user_id"], n_estimators=20, n_jobs=1)
+
+    grouped = model_scores(transactions, path, by=["user_id"])
+    pd.testing.assert_series_equal(model_scores(transactions, path), grouped)
+    assert not model_scores(transactions, path, by=[]).equals(grouped)
+
+
+def test_model_retrained_elsewhere_is_reloaded(transactions, tmp_path):
+    path = str(tmp_path / "model.joblib")
+    train_detector(transactions, path, n_estimators=20, n_jobs=1)
+    first = load_detector(path)
+    assert load_detector(path) is first
+
+    # another process rewrites the file without clearing this process's cache
+    replacement = {"model": "retrained", "features": MODEL_FEATURES, "by": None}
+    joblib.dump(replacement, path)
+    os.utime(path, (os.path.getatime(path), os.path.getmtime(path) + 10))
+    assert load_detector(path) == "retrained"
+
+
+def test_pipeline_uses_the_trained_model_when_there_is_one(transactions, tmp_path, monkeypatch):
+    from udaancredit import pipeline
+
+    path = str(tmp_path / "model.joblib")
+    train_detector(transactions, path, n_estimators=20, n_jobs=1, contamination=0.2)
+    monkeypatch.setattr(pipeline, "model_version", lambda: model_version(path))
+    monkeypatch.setattr(pipeline, "model_outliers", lambda df: model_outliers(df, path))
+
+    user = transactions[transactions["user_id"] == "a"].reset_index(drop=True)
+    assert pipeline.score_transactions(user)["outliers"] == len(model_outliers(user, path))
@@ -0,0 +1,75 @@
+import os
+from datetime import timedelta
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from udaancredit.anomalies import find_activity_gaps, find_activity_gaps_by_user
+from udaancredit.ingest import read_statement
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BUNDLED = ["good.csv", "anomaly.csv", "sample_upi.csv"]
+
+
+def reference_gaps(dates):
+    # the dashboard's original day-by-day loop, kept verbatim as the oracle
+    dates = pd.to_datetime(pd.Series(dates))
+    date_range = pd.date_range(dates.min(), dates.max())
+    active_dates = dates.dt.date.unique()
+    gaps = []
+    gap_start = None
+    for d in date_range:
+        if d.date() not in active_dates:
+            if gap_start is None:
+                gap_start = d
+        else:
+            if gap_start and (d - gap_start).days >= 7:
+                gaps.append((gap_start.date(), (d - timedelta(days=1)).date(), (d - gap_start).days))
+            gap_start = None
+    return gaps
+
+
+def random_history(rng):
+    start = pd.Timestamp("2025-01-01")
+    n = int(rng.integers(1, 60))
+    # mix of dense runs and long silences, some rows on the same day
+    offsets = np.cumsum(rng.choice([0, 1, 2, 6, 7, 8, 20], size=n))
+    return pd.Series(start + pd.to_timedelta(offsets, unit="D"))
+
+
+@pytest.mark.parametrize("seed", range(200))
+def test_gaps_match_reference_loop(seed):
+    dates = random_history(np.random.default_rng(seed))
+    assert find_activity_gaps(dates) == reference_gaps(dates)
+
+
+@pytest.mark.parametrize("seed", range(50))
+def test_timestamps_are_bucketed_by_day(seed):
+    # the loop's date_range starts at the first timestamp's time of day and can
+    # stop short of the last day, so it is only an oracle for midnight dates
+    rng = np.random.default_rng(seed)
+    dates = random_history(rng)
+    timed = dates + pd.to_timedelta(rng.integers(0, 24 * 60, size=len(dates)), unit="min")
+    assert find_activity_gaps(timed) == reference_gaps(dates)
+
+
+@pytest.mark.parametrize("name", BUNDLED)
+def test_gaps_match_reference_loop_on_bundled_statements(name):
+    df, _ = read_statement(os.path.join(ROOT, name))
+    assert find_activity_gaps(df["date"]) == reference_gaps(df["date"])
+
+
+def test_gaps_by_user_match_per_user_reference():
+    rng = np.random.default_rng(0)
+    histories = [pd.DataFrame({"user_id": f"u{i}", "date": random_history(rng)}) for i in range(50)]
+    df = pd.concat(histories, ignore_index=True).sample(frac=1, random_state=1)
+
+    gaps = find_activity_gaps_by_user(df)
+    for user, history in df.groupby("user_id"):
+        rows = gaps[gaps["user_id"] == user]
+        got = [
+            (start.date(), end.date(), int(length))
+            for start, end, length in zip(pd.to_datetime(rows["start"]), pd.to_datetime(rows["end"]), rows["length"])
+        ]
+        assert got == reference_gaps(history["date"])
@@ -0,0 +1,58 @@
+import pandas as pd
+
+from batch_score import main, score_multi_user_file
+from udaancredit.results import ResultStore
+
+ROWS = [
+    ("alice", "2025-01-01", "credit", 900),
+    ("alice", "2025-01-02", "debit", 300),
+    ("bob", "2025-01-01", "credit", 400),
+    ("bob", "2025-01-05", "credit", 450),
+]
+
+
+def write_population(path, user_col):
+    pd.DataFrame(ROWS, columns=[user_col, "date", "type", "amount"]).to_csv(path, index=False)
+
+
+def test_multi_user_file_with_custom_user_column(tmp_path):
+    path = tmp_path / "population.csv"
+    write_population(path, "customer")
+
+    results, _, n_rows, n_quarantined, _ = score_multi_user_file(str(path), user_col="customer", workers=1)
+
+    assert n_rows == 4 and n_quarantined == 0
+    assert sorted(results["customer"]) == ["alice", "bob"]
+    assert results.set_index("customer").loc["bob", "transactions"] == 2
+
+
+def test_cli_scores_a_custom_user_column(tmp_path):
+    path = tmp_path / "population.csv"
+    output = tmp_path / "scores.csv"
+    write_population(path, "Customer ID")
+
+    assert main([str(path), "--user-col", "Customer ID", "-w", "1", "-o", str(output)]) == 0
+    assert sorted(pd.read_csv(output)["Customer ID"]) == ["alice", "bob"]
+
+
+def test_round_trip_between_users_in_one_file_is_flagged(tmp_path):
+    path = tmp_path / "population.csv"
+    pd.DataFrame(
+        [
+            ("a", "2025-01-01", "debit", 5000, "b"),
+            ("b", "2025-01-01", "credit", 5000, "a"),
+            ("b", "2025-01-04", "debit", 4900, "a"),
+            ("a", "2025-01-04", "credit", 4900, "b"),
+        ],
+        columns=["user_id", "date", "type", "amount", "merchant"],
+    ).to_csv(path, index=False)
+
+    store = ResultStore(str(tmp_path / "results.sqlite"))
+    for expected_reused in (0, 2):
+        results, _, _, _, reused = score_multi_user_file(str(path), workers=1, store=store)
+        results = results.set_index("user_id")
+        assert reused == expected_reused
+        assert results.loc["a", "counterparty_flags"] == 1
+        assert results.loc["b", "counterparty_flags"] == 1
+        assert (results["anomaly_status"] != "Clean").all()
+    store.close()
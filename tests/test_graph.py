@@ -0,0 +1,121 @@
+import numpy as np
+import pandas as pd
+
+from udaancredit.graph import CounterpartyGraph, counterparty_flags
+from udaancredit.pipeline import score_transactions
+
+START = pd.Timestamp("2025-01-01")
+
+
+def statement(rows):
+    df = pd.DataFrame(rows, columns=["day", "type", "amount", "merchant"])
+    df.insert(0, "date", START + pd.to_timedelta(df.pop("day"), unit="D"))
+    return df
+
+
+def kirana(days=90, seed=0):
+    # three customer payments a day from a pool of 200, one wholesaler bill
+    rng = np.random.default_rng(seed)
+    rows = []
+    for day in range(days):
+        rows += [(day, "CREDIT", float(rng.integers(100, 600)), f"customer{c}") for c in rng.integers(0, 200, 3)]
+        rows.append((day, "DEBIT", float(rng.integers(800, 1500)), "Wholesaler"))
+    return statement(rows)
+
+
+def test_small_merchant_is_not_flagged():
+    df = kirana()
+    assert counterparty_flags(df) == 0
+    assert score_transactions(df)["counterparty_flags"] == 0
+
+
+def test_purchase_and_refund_is_not_a_round_trip():
+    assert counterparty_flags(statement([(0, "DEBIT", 500.0, "Shop"), (2, "CREDIT", 500.0, "Shop")])) == 0
+    # several purchases against a single refund are still one round trip
+    rows = [(d, "DEBIT", 500.0, "Shop") for d in range(3)] + [(4, "CREDIT", 500.0, "Shop")]
+    assert counterparty_flags(statement(rows)) == 0
+
+
+def test_repeated_round_trips_are_flagged():
+    rows = []
+    for start in (0, 10, 20):
+        rows += [(start, "DEBIT", 5000.0, "Friend"), (start + 2, "CREDIT", 5000.0, "Friend")]
+    assert counterparty_flags(statement(rows)) == 3
+
+
+def test_round_trip_between_two_users_is_flagged():
+    a = statement([(0, "DEBIT", 5000.0, "b")]).assign(user_id="a")
+    b = statement([(0, "CREDIT", 5000.0, "a"), (3, "DEBIT", 4900.0, "a")]).assign(user_id="b")
+    graph = CounterpartyGraph()
+    graph.add(pd.concat([a, b], ignore_index=True))
+    flags = graph.user_flags()
+    assert flags.loc["a", "round_trips"] == 1
+    assert flags.loc["b", "round_trips"] == 1
+
+
+def test_pass_through_fan_in_is_flagged():
+    rows = [(day % 5, "CREDIT", 1000.0, f"payer{day}") for day in range(12)]
+    rows += [(6, "DEBIT", 1900.0, f"payee{i}") for i in range(6)]
+    flags = CounterpartyGraph()
+    flags.add(statement(rows), user_id="mule")
+    assert flags.user_flags().loc["mule", "fan_in"] >= 1
+
+
+def test_fan_out_is_judged_against_the_users_own_baseline():
+    routine = [(week * 7, "DEBIT", 100.0, f"shop{week % 3}") for week in range(8)]
+    burst = [(60, "DEBIT", 100.0, f"payee{i}") for i in range(20)]
+    assert counterparty_flags(statement(routine + burst)) == 1
+
+    # paying twenty different merchants every week is just how this user spends
+    busy = [(week * 7, "DEBIT", 100.0, f"shop{i}") for week in range(9) for i in range(20)]
+    assert counterparty_flags(statement(busy)) == 0
+
+
+def random_population(seed, users=30, rows=3000):
+    # users pay each other as well as outside merchants, so cycles cross users
+    rng = np.random.default_rng(seed)
+    ids = [f"u{i}" for i in range(users)]
+    return pd.DataFrame({
+        "user_id": rng.choice(ids, rows),
+        "date": START + pd.to_timedelta(rng.integers(0, 120, rows), unit="D"),
+        "type": rng.choice(["CREDIT", "DEBIT"], rows),
+        "amount": rng.choice([500.0, 520.0, 1000.0, 2500.0], rows),
+        "merchant": np.where(rng.random(rows) < 0.5, rng.choice(ids, rows), rng.choice(["m1", "m2", "m3"], rows)),
+    })
+
+
+def test_incremental_adds_match_one_bulk_build():
+    df = random_population(0)
+    bulk = CounterpartyGraph()
+    bulk.add(df)
+    bulk._build()
+    incremental = CounterpartyGraph()
+    for part in np.array_split(np.arange(len(df)), 7):
+        incremental.add(df.iloc[part])
+        incremental._build()
+
+    assert incremental.names == bulk.names
+    for name in ("indptr", "dst", "day", "paise"):
+        np.testing.assert_array_equal(getattr(incremental, name), getattr(bulk, name))
+
+
+def test_per_user_flags_match_the_whole_graph():
+    graph = CounterpartyGraph()
+    graph.add(random_population(1))
+    flags = graph.user_flags()
+    assert flags["round_trips"].sum() > 0
+    for user in flags.index:
+        pd.testing.assert_series_equal(graph.flags_for(user), flags.loc[user], check_names=False)
+
+
+def test_long_lived_graph_links_statements_and_skips_repeats():
+    graph = CounterpartyGraph(dedupe=True)
+    a = statement([(0, "DEBIT", 5000.0, "b")])
+    b = statement([(0, "CREDIT", 5000.0, "a"), (3, "DEBIT", 4900.0, "a")])
+    assert counterparty_flags(a, user_id="a", graph=graph) == 0
+    assert counterparty_flags(b, user_id="b", graph=graph) == 1
+    edges = graph.edges
+    # a re-upload, and a longer statement overlapping the first one
+    assert counterparty_flags(b, user_id="b", graph=graph) == 1
+    assert counterparty_flags(pd.concat([b, statement([(9, "DEBIT", 100.0, "shop")])]), user_id="b", graph=graph) == 1
+    assert graph.edges == edges + 1
@@ -0,0 +1,49 @@
+import pytest
+
+from udaancredit.ingest import FIELD_COUNT_REASON, read_statement
+
+ENGINES = ["pyarrow", "c", "python"]
+
+MALFORMED = (
+    b"date,type,amount\n"
+    b"2025-01-01,credit,500\n"
+    b"2025-01-03,credit,1,2,3\n"
+    b"2025-01-04,debit\n"
+    b"\n"
+    b'2025-01-05,debit,"1,000"\n'
+    b"2025-01-06,refund,300\n"
+)
+
+
+@pytest.mark.parametrize("engine", ENGINES)
+def test_lines_with_wrong_field_count_are_quarantined(engine):
+    transactions, quarantine = read_statement(MALFORMED, engine=engine)
+
+    assert transactions["amount"].tolist() == [500.0, 1000.0]
+    assert quarantine["reason"].tolist() == ["unknown type", FIELD_COUNT_REASON, FIELD_COUNT_REASON]
+    assert quarantine["line"].dropna().tolist() == ["2025-01-03,credit,1,2,3", "2025-01-04,debit"]
+
+
+def test_engines_agree():
+    frames = [read_statement(MALFORMED, engine=engine) for engine in ENGINES]
+    for transactions, quarantine in frames[1:]:
+        assert transactions.equals(frames[0][0])
+        assert quarantine.equals(frames[0][1])
+
+
+def test_well_formed_statement_has_empty_quarantine(tmp_path):
+    path = tmp_path / "statement.csv"
+    path.write_bytes(b"date,type,amount\n2025-01-01,CR,100\n2025-01-02,DR,40\n")
+    for engine in ENGINES:
+        transactions, quarantine = read_statement(str(path), engine=engine)
+        assert transactions["type"].tolist() == ["CREDIT", "DEBIT"]
+        assert quarantine.empty
+
+
+def test_extra_columns_are_kept_under_their_names():
+    data = b"Customer,date,type,amount,branch\nc1,2025-01-01,credit,100,x\n"
+    transactions, _ = read_statement(data, extra_columns=["customer"])
+    assert transactions["customer"].tolist() == ["c1"]
+    assert "branch" not in transactions.columns
+    with pytest.raises(ValueError):
+        read_statement(data, extra_columns=["user"])
@@ -0,0 +1,38 @@
+import pytest
+
+from udaancredit import anomalies, graph
+from udaancredit.results import RESULTS_VERSION, ResultStore, _results_version
+
+
+@pytest.mark.parametrize("module, name", [
+    (anomalies, "Z_SCORE_THRESHOLD"),
+    (anomalies, "SPIKE_THRESHOLD"),
+    (anomalies, "MINOR_FLAG_LIMIT"),
+    (graph, "FAN_IN_MIN"),
+    (graph, "ROUND_TRIP_REPEATS"),
+])
+def test_anomaly_thresholds_are_part_of_the_version(monkeypatch, module, name):
+    assert _results_version() == RESULTS_VERSION
+    monkeypatch.setattr(module, name, getattr(module, name) + 1)
+    assert _results_version() != RESULTS_VERSION
+
+
+def test_window_set_is_part_of_the_version(monkeypatch):
+    monkeypatch.setattr("udaancredit.results.DEFAULT_WINDOWS", (30, 90))
+    assert _results_version() != RESULTS_VERSION
+
+
+def test_scoring_version_is_part_of_the_version(monkeypatch):
+    monkeypatch.setattr("udaancredit.results.SCORING_VERSION", "edited")
+    assert _results_version() != RESULTS_VERSION
+
+
+def test_rows_from_another_version_are_not_served(tmp_path):
+    path = str(tmp_path / "results.sqlite")
+    old = ResultStore(path, version="old")
+    old.put("u1", "hash", {"anomaly_status": "Clean"})
+    assert old.get("u1", "hash") == {"anomaly_status": "Clean"}
+    current = ResultStore(path)
+    assert current.get("u1", "hash") is None
+    old.close()
+    current.close()
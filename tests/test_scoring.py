@@ -0,0 +1,118 @@
+import itertools
+import math
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from udaancredit.scoring import (
+    CREDIT_BANDS,
+    INFLOW_BANDS,
+    LOW_CREDIT_CUTOFF,
+    LOW_RISK_CUTOFF,
+    MODERATE_RISK_CUTOFF,
+    SCORE_FEATURES,
+    STABILITY_BANDS,
+    TICKET_BANDS,
+    calculate_credit_score,
+    calculate_credit_scores,
+    risk_categories,
+    risk_category,
+)
+
+
+def reference_score(features):
+    # the original if/elif scorecard, kept verbatim as the oracle
+    score = 300
+    if features["total_credit"] > 10000:
+        score += 150
+    elif features["total_credit"] > 5000:
+        score += 120
+    elif features["total_credit"] > 2000:
+        score += 70
+    stability = features["cashflow_stability"]
+    if stability >= 1.5:
+        score += 150
+    elif stability >= 1.0:
+        score += 120
+    elif stability >= 0.8:
+        score += 60
+    avg = features["avg_ticket_size"]
+    if avg > 800:
+        score += 150
+    elif avg > 400:
+        score += 100
+    elif avg > 200:
+        score += 60
+    inflow = features["inflow_count"]
+    if inflow >= 8:
+        score += 80
+    elif inflow >= 5:
+        score += 50
+    elif inflow >= 3:
+        score += 25
+    if features["outflow_count"] > features["inflow_count"]:
+        score -= 100
+    if features["total_credit"] < 500:
+        score -= 60
+    return max(300, min(score, 900))
+
+
+def reference_risk(score):
+    if score >= 720:
+        return "Low Risk"
+    elif score >= 580:
+        return "Moderate Risk"
+    else:
+        return "High Risk"
+
+
+def around(*cutoffs):
+    # every cutoff, one ulp either side, plus the extremes and NaN
+    values = [0.0, 1e9, math.nan]
+    for cutoff in cutoffs:
+        values += [np.nextafter(cutoff, -np.inf), float(cutoff), np.nextafter(cutoff, np.inf)]
+    return values
+
+
+def band_cutoffs(bands):
+    return [cutoff for cutoff, _ in bands]
+
+
+def test_band_tables_match_reference_cutoffs():
+    assert band_cutoffs(CREDIT_BANDS) == [10000, 5000, 2000]
+    assert band_cutoffs(STABILITY_BANDS) == [1.5, 1.0, 0.8]
+    assert band_cutoffs(TICKET_BANDS) == [800, 400, 200]
+    assert band_cutoffs(INFLOW_BANDS) == [8, 5, 3]
+
+
+def test_scores_match_reference_at_every_boundary():
+    inflow_values = around(*band_cutoffs(INFLOW_BANDS))
+    grid = pd.DataFrame(
+        itertools.product(
+            around(*band_cutoffs(CREDIT_BANDS), LOW_CREDIT_CUTOFF),
+            around(*band_cutoffs(STABILITY_BANDS)),
+            around(*band_cutoffs(TICKET_BANDS)),
+            inflow_values,
+            [0.0, 3.0, 5.0, np.nextafter(8.0, np.inf), 1e9, math.nan],
+        ),
+        columns=SCORE_FEATURES,
+    )
+    records = grid.to_dict("records")
+    expected = np.array([reference_score(row) for row in records])
+
+    np.testing.assert_array_equal(calculate_credit_scores(grid), expected)
+    assert [calculate_credit_score(row) for row in records] == expected.tolist()
+
+
+def test_windowed_scores_read_windowed_columns():
+    features = {f"{name}_30d": 10.0 for name in SCORE_FEATURES}
+    plain = {name: 10.0 for name in SCORE_FEATURES}
+    assert calculate_credit_score(features, window=30) == reference_score(plain)
+    assert calculate_credit_scores({k: [v] for k, v in features.items()}, window=30)[0] == reference_score(plain)
+
+
+@pytest.mark.parametrize("score", around(LOW_RISK_CUTOFF, MODERATE_RISK_CUTOFF, 300, 900))
+def test_risk_category_matches_reference(score):
+    assert risk_category(score) == reference_risk(score)
+    assert risk_categories([score])[0] == reference_risk(score)
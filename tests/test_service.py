@@ -0,0 +1,74 @@
+import asyncio
+
+from aiohttp.test_utils import TestClient, TestServer
+
+from service import create_app
+
+ROWS = [
+    {"date": "2025-01-01", "type": "Received", "amount": 900, "merchant": "Customer"},
+    {"date": "2025-01-02", "type": "DR", "amount": "300", "merchant": "Supplier"},
+]
+
+
+def call(requests):
+    # runs requests(client) against a fresh app and returns its result
+    async def run():
+        async with TestClient(TestServer(create_app(workers=1))) as client:
+            return await requests(client)
+
+    return asyncio.run(run())
+
+
+def test_json_rows_use_ingest_type_aliases():
+    async def requests(client):
+        response = await client.post("/anomalies", json={"transactions": ROWS})
+        return response.status, await response.json()
+
+    status, body = call(requests)
+    assert status == 200
+    assert body["status"] == "Clean"
+
+
+def test_invalid_json_rows_are_rejected_with_400():
+    bad = [{"date": "2025-01-03", "amount": 5}, {"date": "2025-01-04", "type": 7, "amount": 5}]
+
+    async def requests(client):
+        results = []
+        for payload in ({"transactions": []}, {"transactions": ROWS + bad}, {"transactions": "rows"}, ["rows"]):
+            for route in ("/score", "/anomalies"):
+                response = await client.post(route, json=payload)
+                results.append((response.status, await response.json()))
+        return results
+
+    results = call(requests)
+    assert [status for status, _ in results] == [400] * 8
+    rejected = results[2][1]["rejected"]
+    assert [row["reason"] for row in rejected] == ["unknown type", "unknown type"]
+
+
+def test_stats_are_keyed_by_route():
+    async def requests(client):
+        for i in range(3):
+            await client.get(f"/no-such-page-{i}")
+        await client.post("/score", json={"transactions": ROWS})
+        return await (await client.get("/stats")).json()
+
+    routes = call(requests)["routes"]
+    assert set(routes) == {"unmatched", "/score"}
+    assert routes["unmatched"]["requests"] == 3
+
+
+def test_round_trip_across_users_is_flagged_by_the_service_graph():
+    a = [{"date": "2025-01-01", "type": "DEBIT", "amount": 5000, "merchant": "b"}]
+    b = [{"date": "2025-01-01", "type": "CREDIT", "amount": 5000, "merchant": "a"},
+         {"date": "2025-01-04", "type": "DEBIT", "amount": 4900, "merchant": "a"}]
+
+    async def requests(client):
+        flags = []
+        for payload in ({"transactions": a, "user_id": "a"}, {"transactions": b, "user_id": "b"},
+                        {"transactions": b, "user_id": "b"}, {"transactions": b}):
+            response = await client.post("/anomalies", json=payload)
+            flags.append((await response.json())["counterparty_flags"])
+        return flags
+
+    assert call(requests) == [0, 1, 1, 0]
@@ -0,0 +1,7 @@
+from check_startup import DEFAULT_BUDGET_SECONDS, measure_import
+
+
+def test_core_import_is_light_and_within_budget():
+    seconds, loaded = measure_import()
+    assert loaded == [], f"heavy modules imported eagerly: {', '.join(loaded)}"
+    assert seconds <= DEFAULT_BUDGET_SECONDS, f"import udaancredit took {seconds * 1000:.0f} ms"
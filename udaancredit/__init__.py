@@ -0,0 +1,15 @@
+# Headless scoring core: only pandas/numpy are imported here. Storage (pyarrow),
+# the AML model (scikit-learn/joblib) and UI code load only when their modules are.
+from .anomalies import amount_outliers, anomaly_status, daily_volume, find_activity_gaps, spike_days
+from .features import extract_features, extract_features_by_user, stream_features
+from .ingest import read_statement, read_statements
+from .pipeline import score_transactions
+from .scoring import (
+    SCORING_VERSION,
+    assess_risk,
+    calculate_credit_score,
+    calculate_credit_scores,
+    eligible_amount,
+    loan_rate,
+    risk_category,
+)
@@ -0,0 +1,132 @@
+import argparse
+import functools
+import os
+
+import numpy as np
+import pandas as pd
+
+from .ingest import read_statements
+
+DEFAULT_MODEL_PATH = os.environ.get("UDAAN_AML_MODEL", os.path.join("models", "aml_iforest.joblib"))
+MODEL_FEATURES = [
+    "log_amount",
+    "baseline_deviation",
+    "is_credit",
+    "day_of_week",
+    "inter_arrival_days",
+    "day_txn_count",
+    "log_day_total",
+]
+BATCH_SIZE = 1_000_000
+
+
+def transaction_features(df, by=None):
+    # per-transaction and per-day model inputs; the baseline and inter-arrival
+    # time are taken within each `by` group (the whole frame when None)
+    keys = [df[col] for col in by] if by else [pd.Series(0, index=df.index)]
+    amount = df["amount"].astype(float)
+    log_amount = np.log1p(amount.clip(lower=0))
+
+    baseline = log_amount.groupby(keys, sort=False).transform("median")
+    spread = (log_amount - baseline).abs().groupby(keys, sort=False).transform("median")
+    deviation = (log_amount - baseline) / spread.where(spread > 0, 1.0)
+
+    day = df["date"].dt.normalize()
+    order = np.argsort(df["date"].to_numpy(), kind="stable")
+    ordered_days = day.iloc[order]
+    ordered_keys = [k.iloc[order] for k in keys]
+    gap = ordered_days.groupby(ordered_keys, sort=False).diff().dt.days.fillna(0)
+    inter_arrival = gap.reindex(df.index)
+
+    day_groups = amount.groupby([*keys, day], sort=False)
+    return pd.DataFrame({
+        "log_amount": log_amount,
+        "baseline_deviation": deviation,
+        "is_credit": (df["type"] == "CREDIT").astype(np.int8),
+        "day_of_week": df["date"].dt.dayofweek.astype(np.int8),
+        "inter_arrival_days": inter_arrival,
+        "day_txn_count": day_groups.transform("size"),
+        "log_day_total": np.log1p(day_groups.transform("sum").clip(lower=0)),
+    }, index=df.index)[MODEL_FEATURES]
+
+
+def train_detector(df, path=DEFAULT_MODEL_PATH, by=None, contamination=0.01,
+                   n_estimators=200, max_samples=256, n_jobs=-1, random_state=0):
+    import joblib
+    from sklearn.ensemble import IsolationForest
+
+    X = transaction_features(df, by).to_numpy(dtype=np.float32)
+    model = IsolationForest(
+        n_estimators=n_estimators,
+        max_samples=max_samples,
+        contamination=contamination,
+        n_jobs=n_jobs,
+        random_state=random_state,
+    ).fit(X)
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    joblib.dump({"model": model, "features": MODEL_FEATURES, "by": by}, path)
+    _load_bundle.cache_clear()
+    return model
+
+
+@functools.lru_cache(maxsize=4)
+def _load_bundle(path, mtime):
+    # keyed by mtime as well as path, so a model retrained by another process
+    # is reloaded rather than served from memory under the new model_version
+    import joblib
+
+    bundle = joblib.load(path)
+    if bundle["features"] != MODEL_FEATURES:
+        raise ValueError(f"{path} was trained on different features; retrain it")
+    return bundle
+
+
+def load_detector(path=DEFAULT_MODEL_PATH):
+    return _load_bundle(path, model_version(path))["model"]
+
+
+def model_version(path=DEFAULT_MODEL_PATH):
+    # the model file's mtime (a cache key), or None when no model has been trained
+    return os.path.getmtime(path) if os.path.exists(path) else None
+
+
+def model_scores(df, path=DEFAULT_MODEL_PATH, by=None, batch_size=BATCH_SIZE):
+    # positive = more anomalous than the model's contamination threshold; by
+    # defaults to the grouping the model was trained with, minus columns a
+    # single statement doesn't carry (one user is one group anyway)
+    bundle = _load_bundle(path, model_version(path))
+    model = bundle["model"]
+    if by is None:
+        by = [col for col in bundle.get("by") or [] if col in df.columns]
+    X = transaction_features(df, by).to_numpy(dtype=np.float32)
+    scores = np.empty(len(X))
+    for start in range(0, len(X), batch_size):
+        scores[start:start + batch_size] = -model.decision_function(X[start:start + batch_size])
+    return pd.Series(scores, index=df.index)
+
+
+def model_outliers(df, path=DEFAULT_MODEL_PATH, by=None, batch_size=BATCH_SIZE):
+    # same shape as anomalies.amount_outliers: the flagged rows plus a z_score
+    # column, which here holds the model's anomaly score
+    scores = model_scores(df, path, by, batch_size)
+    flagged = scores > 0
+    return df[flagged].assign(z_score=scores[flagged])
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Train the IsolationForest AML detector offline.")
+    parser.add_argument("inputs", nargs="+", help="normalized statement CSVs to train on")
+    parser.add_argument("-o", "--output", default=DEFAULT_MODEL_PATH)
+    parser.add_argument("--by", nargs="*", default=None, help="baseline grouping columns, e.g. user_id")
+    parser.add_argument("--contamination", type=float, default=0.01)
+    parser.add_argument("--n-estimators", type=int, default=200)
+    parser.add_argument("--n-jobs", type=int, default=-1)
+    args = parser.parse_args(argv)
+
+    df, quarantine = read_statements(args.inputs)
+    train_detector(df, args.output, args.by, args.contamination, args.n_estimators, n_jobs=args.n_jobs)
+    print(f"trained on {len(df)} transactions ({len(quarantine)} quarantined) -> {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,205 @@
+import math
+from collections import deque
+
+import numpy as np
+import pandas as pd
+
+MIN_GAP_DAYS = 7
+
+
+def _active_days(dates):
+    days = pd.to_datetime(pd.Series(dates)).dropna().to_numpy().astype("datetime64[D]")
+    return np.unique(days)
+
+
+def find_activity_gaps(dates, min_days=MIN_GAP_DAYS):
+    # (start, end, length) for every run of >= min_days inactive days between
+    # the first and last active day
+    days = _active_days(dates)
+    if len(days) < 2:
+        return []
+    inactive = (days[1:] - days[:-1]).astype(np.int64) - 1
+    idx = np.flatnonzero(inactive >= min_days)
+    starts = (days[idx] + 1).tolist()
+    ends = (days[idx + 1] - 1).tolist()
+    return list(zip(starts, ends, inactive[idx].tolist()))
+
+
+def find_activity_gaps_by_user(df, user_col="user_id", date_col="date", min_days=MIN_GAP_DAYS):
+    days = pd.DataFrame({
+        user_col: df[user_col].to_numpy(),
+        "day": pd.to_datetime(df[date_col]).to_numpy().astype("datetime64[D]"),
+    }).dropna().drop_duplicates().sort_values([user_col, "day"], kind="stable")
+
+    users = days[user_col].to_numpy()
+    day = days["day"].to_numpy().astype("datetime64[D]")
+    same_user = users[1:] == users[:-1]
+    inactive = (day[1:] - day[:-1]).astype(np.int64) - 1
+    idx = np.flatnonzero(same_user & (inactive >= min_days))
+
+    return pd.DataFrame({
+        user_col: users[idx],
+        "start": day[idx] + 1,
+        "end": day[idx + 1] - 1,
+        "length": inactive[idx],
+    })
+
+
+Z_SCORE_THRESHOLD = 3
+SPIKE_THRESHOLD = 2
+MINOR_FLAG_LIMIT = 3
+ROLLING_WINDOW = 30
+MAD_SCALE = 0.6745
+ZSCORE_METHODS = ("zscore", "robust", "rolling")
+
+
+def _rolling_z(values, keys, window):
+    # |x - mean| / std over the `window` previous values of the same group, from
+    # grouped prefix sums; rows with fewer than two prior values get NaN
+    squares = values * values
+    prior_sum = values.groupby(keys, sort=False).cumsum() - values
+    prior_sq = squares.groupby(keys, sort=False).cumsum() - squares
+    prior_n = values.groupby(keys, sort=False).cumcount()
+
+    lag_sum = prior_sum.groupby(keys, sort=False).shift(window, fill_value=0)
+    lag_sq = prior_sq.groupby(keys, sort=False).shift(window, fill_value=0)
+    n = prior_n.clip(upper=window).where(prior_n >= 2)
+    total = prior_sum - lag_sum
+    mean = total / n
+    var = ((prior_sq - lag_sq) - total * mean) / (n - 1)
+    return ((values - mean) / np.sqrt(var.clip(lower=0))).abs()
+
+
+def anomaly_scores(df, by=None, window=ROLLING_WINDOW):
+    # global, robust (median/MAD) and rolling-window absolute z-scores of each
+    # transaction's amount within its `by` group, in one grouped pass
+    order = np.argsort(df['date'].to_numpy(), kind='stable')
+    amount = pd.Series(df['amount'].to_numpy(dtype=float)[order])
+    if by:
+        keys = [pd.Series(df[col].to_numpy()[order]) for col in by]
+    else:
+        keys = [pd.Series(np.zeros(len(df), dtype=np.int8))]
+    groups = amount.groupby(keys, sort=False)
+
+    if by:
+        z_score = ((amount - groups.transform('mean')) / groups.transform('std')).abs()
+    else:
+        z_score = ((amount - amount.mean()) / amount.std()).abs()
+    median = groups.transform('median')
+    deviation = (amount - median).abs()
+    mad = deviation.groupby(keys, sort=False).transform('median')
+    robust_z = MAD_SCALE * deviation / mad.where(mad > 0)
+    rolling_z = _rolling_z(amount, keys, window)
+
+    scores = np.empty((len(df), 3))
+    scores[order] = np.column_stack([z_score, robust_z, rolling_z])
+    return pd.DataFrame(scores, index=df.index, columns=["z_score", "robust_z", "rolling_z"])
+
+
+def amount_outliers(df, threshold=Z_SCORE_THRESHOLD, by=None, method="zscore", window=ROLLING_WINDOW):
+    # transactions whose amount is more than `threshold` std devs from the mean
+    # (of their `by` group, under `method`), with the absolute score in z_score
+    if method not in ZSCORE_METHODS:
+        raise ValueError(f"method must be one of {ZSCORE_METHODS}")
+    if by is None and method == "zscore":
+        z_score = ((df['amount'] - df['amount'].mean()) / df['amount'].std()).abs()
+    else:
+        column = {"zscore": "z_score", "robust": "robust_z", "rolling": "rolling_z"}[method]
+        z_score = anomaly_scores(df, by, window)[column]
+    flagged = z_score > threshold
+    return df[flagged].assign(z_score=z_score[flagged])
+
+
+def daily_volume(df, by=None):
+    # totals per calendar day, so timestamped rows on the same day are one point
+    return df.groupby([*(by or []), df['date'].dt.normalize()])['amount'].sum()
+
+
+def spike_days(daily, threshold=SPIKE_THRESHOLD, by=None):
+    # days whose total is more than `threshold` std devs from the mean daily
+    # total (per `by` group when daily comes from daily_volume(df, by))
+    if not by:
+        return daily[((daily - daily.mean()) / daily.std()).abs() > threshold].index
+    groups = daily.groupby(level=list(range(len(by))), sort=False)
+    z = ((daily - groups.transform('mean')) / groups.transform('std')).abs()
+    return daily[z > threshold].index
+
+
+class RollingZScore:
+    # exact trailing-window z-score, O(1) per update
+
+    def __init__(self, window=ROLLING_WINDOW):
+        self.window = window
+        self.values = deque()
+        self.total = 0.0
+        self.total_sq = 0.0
+
+    def update(self, amount):
+        n = len(self.values)
+        z = float("nan")
+        if n >= 2:
+            mean = self.total / n
+            var = (self.total_sq - self.total * mean) / (n - 1)
+            z = abs(amount - mean) / math.sqrt(var) if var > 0 else float("nan")
+        self.values.append(amount)
+        self.total += amount
+        self.total_sq += amount * amount
+        if len(self.values) > self.window:
+            old = self.values.popleft()
+            self.total -= old
+            self.total_sq -= old * old
+        return z
+
+
+class RobustZScore:
+    # streaming median/MAD z-score, O(1) per update; the median and MAD are
+    # tracked by stochastic approximation, so early scores are approximate
+
+    def __init__(self, rate=0.05):
+        self.rate = rate
+        self.median = None
+        self.mad = None
+
+    def update(self, amount):
+        if self.median is None:
+            self.median = amount
+            return float("nan")
+        deviation = abs(amount - self.median)
+        if self.mad is None:
+            self.mad = deviation or 1.0
+            return float("nan")
+        z = MAD_SCALE * deviation / self.mad if self.mad > 0 else float("nan")
+        step = self.rate * self.mad
+        self.median += step if amount > self.median else -step
+        self.mad += step if deviation > self.mad else -step
+        self.mad = max(self.mad, 1e-9)
+        return z
+
+
+class StreamingAnomalyDetector:
+    # one O(1) scorer per key, e.g. (user_id, type)
+
+    def __init__(self, method="rolling", threshold=Z_SCORE_THRESHOLD, window=ROLLING_WINDOW):
+        if method not in ("robust", "rolling"):
+            raise ValueError("streaming method must be 'robust' or 'rolling'")
+        self.method = method
+        self.threshold = threshold
+        self.window = window
+        self.scorers = {}
+
+    def update(self, key, amount):
+        scorer = self.scorers.get(key)
+        if scorer is None:
+            scorer = RollingZScore(self.window) if self.method == "rolling" else RobustZScore()
+            self.scorers[key] = scorer
+        z = scorer.update(float(amount))
+        return z, z > self.threshold
+
+
+def anomaly_status(total_anomalies):
+    if total_anomalies == 0:
+        return "Clean"
+    elif total_anomalies <= MINOR_FLAG_LIMIT:
+        return "Minor Flags"
+    else:
+        return "High Risk"
@@ -0,0 +1,124 @@
+import numpy as np
+import pandas as pd
+
+from .anomalies import Z_SCORE_THRESHOLD
+from .features import features_from_totals
+from .ingest import TRANSACTION_TYPES, TYPE_DTYPE
+
+# type codes index TRANSACTION_TYPES
+CREDIT, DEBIT = 0, 1
+PAISE_PER_RUPEE = 100
+
+
+class CompactTransactions:
+    # Struct-of-arrays transactions: int32 day ordinals (days since 1970-01-01),
+    # uint8 type codes, int64 amounts in paise and int32 dictionary-encoded user
+    # ids -- 17 bytes a row. Slices return views of the arrays; boolean and
+    # fancy indexing copy them, as numpy does.
+
+    __slots__ = ("day", "type", "paise", "user", "users")
+
+    def __init__(self, day, type, paise, user, users):
+        self.day = day
+        self.type = type
+        self.paise = paise
+        self.user = user
+        self.users = users
+
+    def __len__(self):
+        return len(self.paise)
+
+    def __getitem__(self, rows):
+        return CompactTransactions(self.day[rows], self.type[rows], self.paise[rows], self.user[rows], self.users)
+
+    @property
+    def nbytes(self):
+        return self.day.nbytes + self.type.nbytes + self.paise.nbytes + self.user.nbytes
+
+    def sort_by_user(self):
+        # returns (sorted copy, offsets): user code u owns rows offsets[u]:offsets[u + 1]
+        order = np.lexsort((self.day, self.user))
+        ordered = self[order]
+        offsets = np.searchsorted(ordered.user, np.arange(len(self.users) + 1)).astype(np.int64)
+        return ordered, offsets
+
+
+def from_frame(df, user_col="user_id"):
+    codes = pd.Categorical(df["type"], dtype=TYPE_DTYPE).codes
+    if (codes < 0).any():
+        raise ValueError(f"type must be one of {TRANSACTION_TYPES}")
+    if user_col in df.columns:
+        user, users = pd.factorize(df[user_col], sort=True)
+        user = user.astype(np.int32)
+    else:
+        user, users = np.zeros(len(df), dtype=np.int32), pd.Index([None])
+    return CompactTransactions(
+        day=pd.to_datetime(df["date"]).to_numpy().astype("datetime64[D]").astype(np.int32),
+        type=codes.astype(np.uint8),
+        paise=np.rint(df["amount"].to_numpy(dtype=np.float64) * PAISE_PER_RUPEE).astype(np.int64),
+        user=user,
+        users=pd.Index(users),
+    )
+
+
+def to_frame(compact, user_col="user_id"):
+    df = pd.DataFrame({
+        "date": compact.day.astype("datetime64[D]"),
+        "type": pd.Categorical.from_codes(compact.type, dtype=TYPE_DTYPE),
+        "amount": compact.paise / PAISE_PER_RUPEE,
+    })
+    if compact.users[0] is not None:
+        df[user_col] = compact.users.take(compact.user)
+    return df
+
+
+def _user_type_key(compact):
+    return compact.user.astype(np.intp) * 2 + compact.type
+
+
+def totals_by_user(compact):
+    # one bincount over (user, type) pairs instead of masks and a groupby
+    n = len(compact.users)
+    key = _user_type_key(compact)
+    counts = np.bincount(key, minlength=2 * n).reshape(n, 2)
+    sums = np.bincount(key, weights=compact.paise, minlength=2 * n).reshape(n, 2) / PAISE_PER_RUPEE
+    return pd.DataFrame(
+        {
+            "total_credit": sums[:, CREDIT],
+            "total_debit": sums[:, DEBIT],
+            "inflow_count": counts[:, CREDIT],
+            "outflow_count": counts[:, DEBIT],
+        },
+        index=compact.users.rename("user_id"),
+    )
+
+
+def features_by_user(compact):
+    return features_from_totals(totals_by_user(compact))
+
+
+def amount_zscores(compact, by_user=False):
+    # |z| of each amount, against all rows or against the row's own user
+    amount = compact.paise.astype(np.float64)
+    if not by_user:
+        return np.abs(amount - amount.mean()) / amount.std(ddof=1)
+    counts = np.bincount(compact.user, minlength=len(compact.users))
+    mean = np.bincount(compact.user, weights=amount, minlength=len(compact.users)) / np.maximum(counts, 1)
+    amount -= mean[compact.user]
+    var = np.bincount(compact.user, weights=amount * amount, minlength=len(compact.users)) / np.maximum(counts - 1, 1)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.abs(amount) / np.sqrt(var)[compact.user]
+
+
+def outlier_rows(compact, threshold=Z_SCORE_THRESHOLD, by_user=False):
+    # row positions, so callers can view the flagged rows without a copy of the rest
+    return np.flatnonzero(amount_zscores(compact, by_user) > threshold)
+
+
+def daily_volume(compact):
+    # rupee totals per active day, indexed like anomalies.daily_volume for spike_days
+    first = compact.day.min()
+    totals = np.bincount(compact.day - first, weights=compact.paise) / PAISE_PER_RUPEE
+    days = np.flatnonzero(np.bincount(compact.day - first))
+    index = pd.DatetimeIndex((days + first).astype("datetime64[D]"), name="date")
+    return pd.Series(totals[days], index=index, name="amount")
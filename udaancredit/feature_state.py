@@ -0,0 +1,142 @@
+import json
+import math
+
+import pandas as pd
+
+
+def new_state():
+    return {
+        "total_credit": 0.0,
+        "total_debit": 0.0,
+        "inflow_count": 0,
+        "outflow_count": 0,
+        # running mean / M2 (Welford) over every transaction amount
+        "amount_n": 0,
+        "amount_mean": 0.0,
+        "amount_m2": 0.0,
+        # per-day totals plus Welford stats over them, for the spike test
+        "daily": {},
+        "daily_n": 0,
+        "daily_mean": 0.0,
+        "daily_m2": 0.0,
+        "first_date": None,
+        "last_date": None,
+    }
+
+
+def _merge_moments(n_a, mean_a, m2_a, n_b, mean_b, m2_b):
+    # Chan et al. pairwise combination of two Welford accumulators
+    n = n_a + n_b
+    if n == 0:
+        return 0, 0.0, 0.0
+    delta = mean_b - mean_a
+    mean = mean_a + delta * n_b / n
+    m2 = m2_a + m2_b + delta * delta * n_a * n_b / n
+    return n, mean, m2
+
+
+def _add_value(n, mean, m2, x):
+    n += 1
+    delta = x - mean
+    mean += delta / n
+    m2 += delta * (x - mean)
+    return n, mean, m2
+
+
+def _remove_value(n, mean, m2, x):
+    if n <= 1:
+        return 0, 0.0, 0.0
+    n -= 1
+    delta = x - mean
+    mean -= delta / n
+    m2 -= delta * (x - mean)
+    return n, mean, max(m2, 0.0)
+
+
+def update_state(state, delta):
+    # folds a batch of new transactions (date, type, amount) into the state in O(len(delta))
+    if len(delta) == 0:
+        return state
+
+    dates = pd.to_datetime(delta["date"])
+    amount = pd.to_numeric(delta["amount"])
+    credit = delta["type"] == "CREDIT"
+    debit = delta["type"] == "DEBIT"
+
+    state["total_credit"] += float(amount[credit].sum())
+    state["total_debit"] += float(amount[debit].sum())
+    state["inflow_count"] += int(credit.sum())
+    state["outflow_count"] += int(debit.sum())
+
+    valid = amount.dropna()
+    if len(valid):
+        n_b = len(valid)
+        mean_b = float(valid.mean())
+        m2_b = float(((valid - mean_b) ** 2).sum())
+        state["amount_n"], state["amount_mean"], state["amount_m2"] = _merge_moments(
+            state["amount_n"], state["amount_mean"], state["amount_m2"], n_b, mean_b, m2_b
+        )
+
+    daily = state["daily"]
+    moments = (state["daily_n"], state["daily_mean"], state["daily_m2"])
+    day_totals = amount.groupby(dates.dt.strftime("%Y-%m-%d")).sum()
+    for day, added in day_totals.items():
+        added = float(added)
+        if day in daily:
+            moments = _remove_value(*moments, daily[day])
+            daily[day] += added
+        else:
+            daily[day] = added
+        moments = _add_value(*moments, daily[day])
+    state["daily_n"], state["daily_mean"], state["daily_m2"] = moments
+
+    first = dates.min().strftime("%Y-%m-%d")
+    last = dates.max().strftime("%Y-%m-%d")
+    if state["first_date"] is None or first < state["first_date"]:
+        state["first_date"] = first
+    if state["last_date"] is None or last > state["last_date"]:
+        state["last_date"] = last
+    return state
+
+
+def state_from_frame(df):
+    return update_state(new_state(), df)
+
+
+def state_features(state):
+    inflow_count = state["inflow_count"]
+    outflow_count = state["outflow_count"]
+    total_credit = state["total_credit"]
+    return {
+        "total_credit": total_credit,
+        "total_debit": state["total_debit"],
+        "inflow_count": inflow_count,
+        "outflow_count": outflow_count,
+        "avg_ticket_size": total_credit / inflow_count if inflow_count > 0 else 0,
+        "cashflow_stability": inflow_count / max(outflow_count, 1),
+    }
+
+
+def _std(n, m2):
+    # sample std (ddof=1) to match pandas Series.std
+    return math.sqrt(m2 / (n - 1)) if n > 1 else float("nan")
+
+
+def anomaly_stats(state):
+    # the mean/std inputs the dashboard's z-score and daily spike tests use
+    return {
+        "amount_mean": state["amount_mean"] if state["amount_n"] else float("nan"),
+        "amount_std": _std(state["amount_n"], state["amount_m2"]),
+        "daily_mean": state["daily_mean"] if state["daily_n"] else float("nan"),
+        "daily_std": _std(state["daily_n"], state["daily_m2"]),
+        "first_date": state["first_date"],
+        "last_date": state["last_date"],
+    }
+
+
+def dump_state(state):
+    return json.dumps(state, sort_keys=True)
+
+
+def load_state(payload):
+    return json.loads(payload)
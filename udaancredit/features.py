@@ -0,0 +1,110 @@
+import pandas as pd
+
+from .instrumentation import incr, traced
+
+FEATURE_COLUMNS = [
+    "total_credit",
+    "total_debit",
+    "inflow_count",
+    "outflow_count",
+    "avg_ticket_size",
+    "cashflow_stability",
+]
+TOTAL_COLUMNS = FEATURE_COLUMNS[:4]
+
+
+def window_column(name, days):
+    return f"{name}_{days}d"
+
+
+@traced("features.extract_features")
+def extract_features(df):
+    incr("rows_processed_total", len(df), stage="features")
+    if not pd.api.types.is_datetime64_any_dtype(df['date']):
+        df['date'] = pd.to_datetime(df['date'])
+
+    credit = df['type'] == 'CREDIT'
+    debit = df['type'] == 'DEBIT'
+
+    total_credit = df['amount'][credit].sum()
+    total_debit = df['amount'][debit].sum()
+
+    inflow_count = int(credit.sum())
+    outflow_count = int(debit.sum())
+
+    avg_ticket_size = total_credit / inflow_count if inflow_count > 0 else 0
+
+    cashflow_stability = inflow_count / max(outflow_count, 1)
+
+    return {
+        "total_credit": total_credit,
+        "total_debit": total_debit,
+        "inflow_count": inflow_count,
+        "outflow_count": outflow_count,
+        "avg_ticket_size": avg_ticket_size,
+        "cashflow_stability": cashflow_stability
+    }
+
+
+def aggregate_by_user(df, user_col="user_id"):
+    # one pass over the rows: per-user credit/debit sums and counts
+    credit = df['type'] == 'CREDIT'
+    debit = df['type'] == 'DEBIT'
+    parts = pd.DataFrame({
+        "total_credit": df['amount'].where(credit, 0),
+        "total_debit": df['amount'].where(debit, 0),
+        "inflow_count": credit.astype("int64"),
+        "outflow_count": debit.astype("int64"),
+    })
+    return parts.groupby(df[user_col], sort=False).sum()
+
+
+def merge_totals(left, right):
+    if left is None:
+        return right
+    merged = left.add(right, fill_value=0)
+    return merged.astype({"inflow_count": "int64", "outflow_count": "int64"})
+
+
+def features_from_totals(totals):
+    features = totals[TOTAL_COLUMNS].copy()
+    inflow = features["inflow_count"]
+    features["avg_ticket_size"] = (features["total_credit"] / inflow.where(inflow > 0)).fillna(0)
+    features["cashflow_stability"] = inflow / features["outflow_count"].clip(lower=1)
+    return features
+
+
+@traced("features.extract_features_by_user")
+def extract_features_by_user(df, user_col="user_id"):
+    incr("rows_processed_total", len(df), stage="features")
+    return features_from_totals(aggregate_by_user(df, user_col))
+
+
+@traced("features.stream_features")
+def stream_features(source, user_col="user_id", chunksize=500_000, **read_csv_kwargs):
+    # reads a multi-user CSV chunk by chunk, so peak memory is one chunk plus
+    # one row of running totals per user
+    reader = pd.read_csv(
+        source,
+        usecols=[user_col, "type", "amount"],
+        chunksize=chunksize,
+        **read_csv_kwargs,
+    )
+    totals = None
+    for chunk in reader:
+        chunk["type"] = chunk["type"].str.upper()
+        chunk["amount"] = pd.to_numeric(chunk["amount"])
+        incr("rows_processed_total", len(chunk), stage="features")
+        totals = merge_totals(totals, aggregate_by_user(chunk, user_col))
+    if totals is None:
+        return pd.DataFrame(columns=FEATURE_COLUMNS).rename_axis(user_col)
+    return features_from_totals(totals)
+
+
+def feature_dicts(features):
+    # yields (user, feature dict) in the same shape extract_features returns
+    for user, row in zip(features.index, features.itertuples(index=False)):
+        feats = row._asdict()
+        feats["inflow_count"] = int(feats["inflow_count"])
+        feats["outflow_count"] = int(feats["outflow_count"])
+        yield user, feats
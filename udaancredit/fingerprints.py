@@ -0,0 +1,66 @@
+import os
+from urllib.parse import quote
+
+import numpy as np
+import pandas as pd
+
+
+def fingerprints(df):
+    # uint64 per row from (day, amount in paise, type, counterparty) plus the
+    # row's occurrence number among identical rows: two genuine ₹50 payments
+    # to the same shop on one day stay distinct, while re-uploading either
+    # one reproduces its fingerprint
+    merchant = df["merchant"] if "merchant" in df.columns else pd.Series("", index=df.index)
+    # hash each distinct counterparty once rather than every row's string
+    codes, names = pd.factorize(merchant.astype("string").str.strip().fillna(""))
+    key = pd.DataFrame({
+        "day": pd.to_datetime(df["date"]).to_numpy().astype("datetime64[D]").astype(np.int64),
+        "paise": np.rint(df["amount"].to_numpy(dtype=np.float64) * 100).astype(np.int64),
+        "debit": (df["type"] == "DEBIT").to_numpy(),
+        "merchant": pd.util.hash_array(names.to_numpy(dtype=object))[codes],
+    })
+    base = pd.util.hash_pandas_object(key, index=False).to_numpy()
+
+    # identical rows are rare, so only those are ranked
+    occurrence = np.zeros(len(base), dtype=np.int64)
+    repeated = pd.Series(base).duplicated(keep=False).to_numpy()
+    if repeated.any():
+        occurrence[repeated] = pd.Series(base[repeated]).groupby(base[repeated], sort=False).cumcount().to_numpy()
+    return base ^ pd.util.hash_array(occurrence)
+
+
+def contains(index, fps):
+    # membership of each fingerprint in a sorted index; the queries are sorted
+    # first so the binary searches walk the index in order
+    found = np.zeros(len(fps), dtype=bool)
+    if len(index) == 0 or len(fps) == 0:
+        return found
+    order = np.argsort(fps)
+    query = fps[order]
+    pos = np.minimum(np.searchsorted(index, query), len(index) - 1)
+    found[order] = index[pos] == query
+    return found
+
+
+def _index_path(user_id, root):
+    return os.path.join(root, f"{quote(str(user_id), safe='')}.npy")
+
+
+def load_index(user_id, root):
+    path = _index_path(user_id, root)
+    if not os.path.exists(path):
+        return np.empty(0, dtype=np.uint64)
+    return np.load(path, mmap_mode="r")
+
+
+def add_to_index(user_id, fps, root):
+    # fps must not already be in the index; both runs are sorted, so the
+    # stable sort is a linear merge
+    merged = np.concatenate([load_index(user_id, root), np.unique(fps)])
+    merged.sort(kind="stable")
+    os.makedirs(root, exist_ok=True)
+    path = _index_path(user_id, root)
+    tmp = f"{path[:-4]}.tmp.npy"
+    np.save(tmp, merged)
+    os.replace(tmp, path)
+    return len(merged)
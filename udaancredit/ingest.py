@@ -0,0 +1,192 @@
+import csv
+import importlib.util
+import io
+import os
+
+import numpy as np
+import pandas as pd
+
+TRANSACTION_TYPES = ["CREDIT", "DEBIT"]
+TYPE_DTYPE = pd.CategoricalDtype(TRANSACTION_TYPES)
+
+PYARROW_AVAILABLE = importlib.util.find_spec("pyarrow") is not None
+
+_GENERIC_TYPES = {"CREDIT": "CREDIT", "DEBIT": "DEBIT", "CR": "CREDIT", "DR": "DEBIT"}
+
+# Column mappings for each app's CSV export. Header names are matched
+# case-insensitively; "signed_amount" apps encode the direction in the amount's
+# sign instead of a type column. Adapters are tried in order, generic last.
+ADAPTERS = {
+    "phonepe": {
+        "columns": {"date": "date", "transaction details": "merchant", "type": "type", "amount": "amount"},
+        "types": _GENERIC_TYPES,
+    },
+    "gpay": {
+        "columns": {"date": "date", "details": "merchant", "transaction type": "type", "amount": "amount"},
+        "types": {**_GENERIC_TYPES, "RECEIVED": "CREDIT", "PAID": "DEBIT", "SENT": "DEBIT"},
+    },
+    "paytm": {
+        "columns": {"date": "date", "activity": "merchant", "amount": "amount"},
+        "signed_amount": True,
+    },
+    "bhim": {
+        "columns": {"transaction date": "date", "payee": "merchant", "dr/cr": "type", "amount": "amount"},
+        "types": _GENERIC_TYPES,
+        "dayfirst": True,
+    },
+    "generic": {
+        "columns": {"date": "date", "type": "type", "amount": "amount", "merchant": "merchant", "user_id": "user_id"},
+        "types": _GENERIC_TYPES,
+    },
+}
+REQUIRED_COLUMNS = {"date", "amount"}
+# every app's type labels, for rows that don't come with a known layout
+RECORD_TYPES = {label: kind for adapter in ADAPTERS.values() for label, kind in adapter.get("types", {}).items()}
+FIELD_COUNT_REASON = "wrong number of fields"
+
+
+def _rewind(source):
+    if hasattr(source, "seek"):
+        source.seek(0)
+
+
+def peek_columns(source):
+    if isinstance(source, (bytes, bytearray)):
+        source = io.BytesIO(source)
+    header = pd.read_csv(source, nrows=0)
+    _rewind(source)
+    return list(header.columns)
+
+
+def detect_adapter(columns):
+    present = {c.strip().lower() for c in columns}
+    for name, adapter in ADAPTERS.items():
+        mapping = adapter["columns"]
+        needed = {src for src, dst in mapping.items() if dst in REQUIRED_COLUMNS}
+        if not adapter.get("signed_amount"):
+            needed |= {src for src, dst in mapping.items() if dst == "type"}
+        if needed <= present and (name == "generic" or len(set(mapping) & present) == len(mapping)):
+            return name
+    raise ValueError(f"Unrecognised statement layout: {', '.join(columns)}")
+
+
+def _misshapen_lines(source, width):
+    # (line index, text) of every data line whose field count differs from the
+    # header's. The C and python parsers pad short lines and, with usecols, keep
+    # long ones, so they are found up front and skipped by index instead.
+    is_path = isinstance(source, (str, os.PathLike))
+    f = open(source, newline="", encoding="utf-8") if is_path else io.TextIOWrapper(source, encoding="utf-8", newline="")
+    try:
+        bad = [(index, fields) for index, fields in enumerate(csv.reader(f)) if index and fields and len(fields) != width]
+    finally:
+        if is_path:
+            f.close()
+        else:
+            f.detach()
+    _rewind(source)
+    text = io.StringIO()
+    csv.writer(text, lineterminator="\n").writerows(fields for _, fields in bad)
+    return list(zip((index for index, _ in bad), text.getvalue().splitlines()))
+
+
+def _clean_amount(raw):
+    return pd.to_numeric(raw.str.replace(r"(?i)rs\.?|inr|₹|,|\s", "", regex=True), errors="coerce")
+
+
+def _validate(raw, adapter):
+    # raw: string columns already renamed to the adapter's targets
+    dates = pd.to_datetime(raw["date"].str.strip(), errors="coerce", dayfirst=adapter.get("dayfirst", False))
+    amount = _clean_amount(raw["amount"])
+    if adapter.get("signed_amount"):
+        kind = pd.Series(np.where(amount < 0, "DEBIT", "CREDIT"), index=raw.index)
+        amount = amount.abs()
+    else:
+        kind = raw["type"].str.strip().str.upper().map(adapter["types"])
+
+    reason = pd.Series(pd.NA, index=raw.index, dtype="string")
+    reason = reason.mask(kind.isna(), "unknown type")
+    reason = reason.mask(amount.isna(), "invalid amount")
+    reason = reason.mask(dates.isna(), "invalid date")
+    bad = reason.notna().to_numpy()
+
+    transactions = raw[~bad].copy()
+    transactions["date"] = dates[~bad]
+    transactions["type"] = kind[~bad].astype(TYPE_DTYPE)
+    transactions["amount"] = amount[~bad].astype("float64")
+    return transactions.reset_index(drop=True), raw[bad].assign(reason=reason[bad])
+
+
+def read_records(records):
+    # JSON-style rows ({"date", "type", "amount"[, "merchant"]} mappings) through
+    # the same validation as a CSV statement; any app's type aliases are
+    # accepted. Returns (transactions, quarantine) like read_statement.
+    if not isinstance(records, list) or not all(isinstance(r, dict) for r in records):
+        raise ValueError("transactions must be a list of objects")
+    if not records:
+        raise ValueError("no transactions")
+    frame = pd.DataFrame.from_records(records)
+    by_lower = {str(c).strip().lower(): c for c in frame.columns}
+    adapter = {**ADAPTERS["generic"], "types": RECORD_TYPES}
+    raw = pd.DataFrame(index=frame.index)
+    for src, dst in adapter["columns"].items():
+        if src in by_lower:
+            raw[dst] = frame[by_lower[src]].astype("string")
+        elif dst in REQUIRED_COLUMNS or dst == "type":
+            raw[dst] = pd.Series(pd.NA, index=frame.index, dtype="string")
+    transactions, quarantine = _validate(raw, adapter)
+    return transactions, quarantine.reset_index(drop=True)
+
+
+def read_statement(source, app=None, engine=None, extra_columns=()):
+    # returns (transactions, quarantine); rows that fail validation are moved to
+    # quarantine with a "reason" column instead of raising. extra_columns are
+    # kept under their given names alongside the adapter's columns, e.g. a
+    # non-default user id column
+    if isinstance(source, (bytes, bytearray)):
+        source = io.BytesIO(source)
+    columns = peek_columns(source)
+    app = app or detect_adapter(columns)
+    adapter = ADAPTERS[app]
+
+    by_lower = {c.strip().lower(): c for c in columns}
+    rename = {by_lower[src]: dst for src, dst in adapter["columns"].items() if src in by_lower}
+    for name in extra_columns:
+        if name.strip().lower() not in by_lower:
+            raise ValueError(f"Statement has no {name!r} column")
+        rename.setdefault(by_lower[name.strip().lower()], name)
+    if engine is None:
+        engine = "pyarrow" if PYARROW_AVAILABLE else "c"
+
+    # lines with the wrong number of fields are quarantined, whichever engine
+    # parses the rest
+    if engine == "pyarrow":
+        misshapen = []
+        options = {"on_bad_lines": lambda row: misshapen.append(row.text) or "skip"}
+    else:
+        skipped = _misshapen_lines(source, len(columns))
+        misshapen = [text for _, text in skipped]
+        options = {"skiprows": [index for index, _ in skipped]}
+
+    raw = pd.read_csv(
+        source,
+        usecols=list(rename),
+        dtype={c: "string" for c in rename},
+        engine=engine,
+        **options,
+    ).rename(columns=rename)
+
+    transactions, quarantine = _validate(raw, adapter)
+    if misshapen:
+        unread = pd.DataFrame({"line": pd.array(misshapen, dtype="string"), "reason": FIELD_COUNT_REASON})
+        quarantine = pd.concat([quarantine, unread.astype({"reason": "string"})])
+    return transactions, quarantine.reset_index(drop=True)
+
+
+def read_statements(paths, app=None, engine=None, extra_columns=()):
+    frames, rejected = [], []
+    for path in paths:
+        transactions, quarantine = read_statement(path, app=app, engine=engine, extra_columns=extra_columns)
+        name = os.path.basename(str(path))
+        frames.append(transactions.assign(source=name))
+        rejected.append(quarantine.assign(source=name))
+    return pd.concat(frames, ignore_index=True), pd.concat(rejected, ignore_index=True)
@@ -0,0 +1,195 @@
+import functools
+import os
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+
+METRIC_PREFIX = "udaan"
+
+_enabled = os.environ.get("UDAAN_TRACE", "") not in ("", "0")
+_lock = threading.Lock()
+_stage_seconds = {}
+_stage_calls = {}
+_counters = {}
+_local = threading.local()
+_server = None
+_NULL_SPAN = nullcontext()
+
+
+def enable(on=True):
+    global _enabled
+    _enabled = on
+
+
+def enabled():
+    return _enabled
+
+
+@contextmanager
+def _span(name):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        with _lock:
+            _stage_seconds[name] = _stage_seconds.get(name, 0.0) + elapsed
+            _stage_calls[name] = _stage_calls.get(name, 0) + 1
+        spans = getattr(_local, "spans", None)
+        if spans is not None:
+            spans.append((name, elapsed))
+
+
+def span(name):
+    # times the block under `name`; a shared no-op context when tracing is off
+    if not _enabled:
+        return _NULL_SPAN
+    return _span(name)
+
+
+def traced(name):
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            if not _enabled:
+                return fn(*args, **kwargs)
+            with _span(name):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def incr(name, value=1, **labels):
+    if not _enabled:
+        return
+    key = (name, tuple(sorted(labels.items())))
+    with _lock:
+        _counters[key] = _counters.get(key, 0) + value
+
+
+@contextmanager
+def _cached_stage(name):
+    _local.cache_missed = False
+    with _span(name):
+        yield
+    outcome = "cache_misses_total" if _local.cache_missed else "cache_hits_total"
+    incr(outcome, stage=name)
+
+
+def cached_stage(name):
+    # like span(), and also counts a cache hit or miss for the block; the cached
+    # function body calls cache_miss(), which only runs when the cache missed
+    if not _enabled:
+        return _NULL_SPAN
+    return _cached_stage(name)
+
+
+def cache_miss():
+    _local.cache_missed = True
+
+
+def begin_run():
+    # starts collecting this thread's spans, e.g. one Streamlit script run
+    _local.spans = []
+
+
+def run_spans():
+    return list(getattr(_local, "spans", None) or [])
+
+
+def add_run_spans(spans):
+    # merges spans collected on another thread (a background stage) into this run's
+    current = getattr(_local, "spans", None)
+    if current is not None:
+        current.extend(spans)
+
+
+def snapshot():
+    with _lock:
+        return {
+            "stages": {
+                name: {"seconds": _stage_seconds[name], "calls": _stage_calls[name]}
+                for name in _stage_seconds
+            },
+            "counters": dict(_counters),
+        }
+
+
+def reset():
+    with _lock:
+        _stage_seconds.clear()
+        _stage_calls.clear()
+        _counters.clear()
+
+
+def _labels(pairs):
+    if not pairs:
+        return ""
+    body = ",".join(f'{k}="{v}"' for k, v in pairs)
+    return "{" + body + "}"
+
+
+def prometheus_text():
+    snap = snapshot()
+    lines = [
+        f"# HELP {METRIC_PREFIX}_stage_seconds_total Wall time spent in each instrumented stage.",
+        f"# TYPE {METRIC_PREFIX}_stage_seconds_total counter",
+    ]
+    for name, stage in sorted(snap["stages"].items()):
+        lines.append(f'{METRIC_PREFIX}_stage_seconds_total{{stage="{name}"}} {stage["seconds"]:.6f}')
+    lines += [
+        f"# HELP {METRIC_PREFIX}_stage_calls_total Number of times each instrumented stage ran.",
+        f"# TYPE {METRIC_PREFIX}_stage_calls_total counter",
+    ]
+    for name, stage in sorted(snap["stages"].items()):
+        lines.append(f'{METRIC_PREFIX}_stage_calls_total{{stage="{name}"}} {stage["calls"]}')
+
+    by_name = {}
+    for (name, labels), value in snap["counters"].items():
+        by_name.setdefault(name, []).append((labels, value))
+    for name, series in sorted(by_name.items()):
+        lines.append(f"# TYPE {METRIC_PREFIX}_{name} counter")
+        for labels, value in sorted(series):
+            lines.append(f"{METRIC_PREFIX}_{name}{_labels(labels)} {value}")
+    return "\n".join(lines) + "\n"
+
+
+def write_prometheus(path):
+    # atomic write, for the node_exporter textfile collector
+    tmp = f"{path}.tmp"
+    with open(tmp, "w") as f:
+        f.write(prometheus_text())
+    os.replace(tmp, path)
+
+
+def _metrics_handler():
+    from http.server import BaseHTTPRequestHandler
+
+    class MetricsHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path != "/metrics":
+                self.send_error(404)
+                return
+            body = prometheus_text().encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    return MetricsHandler
+
+
+def serve_prometheus(port, host="127.0.0.1"):
+    # serves /metrics from a daemon thread; repeated calls reuse the server
+    global _server
+    with _lock:
+        if _server is None:
+            from http.server import ThreadingHTTPServer
+
+            _server = ThreadingHTTPServer((host, port), _metrics_handler())
+            threading.Thread(target=_server.serve_forever, daemon=True).start()
+    return _server
@@ -0,0 +1,42 @@
+import numpy as np
+import pandas as pd
+
+PAGE_SIZE = 50
+SORT_COLUMNS = ("date", "amount")
+
+
+def filter_mask(df, types=None, start=None, end=None, min_amount=None, max_amount=None):
+    # start/end are inclusive calendar days
+    mask = np.ones(len(df), dtype=bool)
+    if types:
+        mask &= df["type"].isin(types).to_numpy()
+    if start is not None:
+        mask &= (df["date"] >= pd.Timestamp(start).normalize()).to_numpy()
+    if end is not None:
+        mask &= (df["date"] < pd.Timestamp(end).normalize() + pd.Timedelta(days=1)).to_numpy()
+    if min_amount is not None:
+        mask &= (df["amount"] >= min_amount).to_numpy()
+    if max_amount is not None:
+        mask &= (df["amount"] <= max_amount).to_numpy()
+    return mask
+
+
+def transaction_page(df, page=0, page_size=PAGE_SIZE, sort_by="date", descending=False, **filters):
+    # returns only the rows of one page plus counts/totals over every filtered
+    # row, so callers never copy or send the full frame
+    rows = np.flatnonzero(filter_mask(df, **filters))
+    if sort_by is not None and len(rows):
+        order = np.argsort(df[sort_by].to_numpy()[rows], kind="stable")
+        rows = rows[order[::-1] if descending else order]
+    pages = max(1, -(-len(rows) // page_size))
+    page = min(max(page, 0), pages - 1)
+    amount = df["amount"].to_numpy()[rows]
+    credit = (df["type"].to_numpy()[rows] == "CREDIT")
+    summary = {
+        "rows": len(rows),
+        "page": page,
+        "pages": pages,
+        "total_credit": float(amount[credit].sum()),
+        "total_debit": float(amount[~credit].sum()),
+    }
+    return df.iloc[rows[page * page_size:(page + 1) * page_size]], summary
@@ -0,0 +1,127 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+import numpy as np
+import pandas as pd
+
+from .anomalies import MIN_GAP_DAYS, SPIKE_THRESHOLD, Z_SCORE_THRESHOLD
+from .compact import CompactTransactions, amount_zscores, from_frame, totals_by_user
+from .features import features_from_totals
+from .instrumentation import traced
+
+OUTPUT_COLUMNS = {
+    "total_credit": np.float64,
+    "total_debit": np.float64,
+    "inflow_count": np.int64,
+    "outflow_count": np.int64,
+    "outliers": np.int64,
+    "spike_days": np.int64,
+    "activity_gaps": np.int64,
+}
+# tasks per worker; more than one so a slow chunk doesn't leave cores idle
+TASKS_PER_WORKER = 8
+
+# worker-side views of the shared arrays, set by _attach
+_arrays = {}
+_blocks = []
+
+
+def _create(source):
+    shm = shared_memory.SharedMemory(create=True, size=max(source.nbytes, 1))
+    array = np.ndarray(source.shape, dtype=source.dtype, buffer=shm.buf)
+    array[:] = source
+    return shm, array
+
+
+def _attach(specs):
+    for name, (shm_name, shape, dtype) in specs.items():
+        # pool workers share the parent's resource tracker, so attaching does not
+        # add a second owner; the parent unlinks every block when the run ends
+        shm = shared_memory.SharedMemory(name=shm_name)
+        _blocks.append(shm)
+        _arrays[name] = np.ndarray(shape, dtype=dtype, buffer=shm.buf)
+
+
+def _run_users(start, stop):
+    # users start..stop own the contiguous rows offsets[start]:offsets[stop];
+    # inputs are read through zero-copy slices and results written in place
+    offsets = _arrays["offsets"]
+    lo, hi = offsets[start], offsets[stop]
+    n = stop - start
+    user = np.repeat(np.arange(n, dtype=np.int32), np.diff(offsets[start:stop + 1]))
+    day = _arrays["day"][lo:hi]
+    paise = _arrays["paise"][lo:hi]
+    view = CompactTransactions(day, _arrays["type"][lo:hi], paise, user, pd.RangeIndex(n))
+
+    totals = totals_by_user(view)
+    for column in totals.columns:
+        _arrays[column][start:stop] = totals[column].to_numpy()
+    flagged = amount_zscores(view, by_user=True) > Z_SCORE_THRESHOLD
+    _arrays["outliers"][start:stop] = np.bincount(user[flagged], minlength=n)
+
+    # rows are sorted by (user, day): one run per active day
+    runs = np.flatnonzero(np.r_[True, (user[1:] != user[:-1]) | (day[1:] != day[:-1])])
+    daily = np.add.reduceat(paise, runs).astype(np.float64) if len(runs) else np.empty(0)
+    daily_user, daily_day = user[runs], day[runs]
+    days_per_user = np.bincount(daily_user, minlength=n)
+    mean = np.bincount(daily_user, weights=daily, minlength=n) / np.maximum(days_per_user, 1)
+    deviation = daily - mean[daily_user]
+    var = np.bincount(daily_user, weights=deviation * deviation, minlength=n) / (days_per_user - 1).clip(min=1)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        spikes = (np.abs(deviation) / np.sqrt(var)[daily_user] > SPIKE_THRESHOLD) & (days_per_user[daily_user] > 1)
+    _arrays["spike_days"][start:stop] = np.bincount(daily_user[spikes], minlength=n)
+
+    same_user = daily_user[1:] == daily_user[:-1]
+    gap = same_user & (np.diff(daily_day) - 1 >= MIN_GAP_DAYS)
+    _arrays["activity_gaps"][start:stop] = np.bincount(daily_user[1:][gap], minlength=n)
+
+
+def _task_bounds(offsets, tasks):
+    # user ranges holding roughly equal numbers of rows
+    targets = np.linspace(0, offsets[-1], tasks + 1)
+    bounds = np.unique(np.r_[0, np.searchsorted(offsets, targets[1:-1]), len(offsets) - 1])
+    return list(zip(bounds[:-1].tolist(), bounds[1:].tolist()))
+
+
+@traced("parallel.population_run")
+def population_run(df, workers=None, user_col="user_id"):
+    # per-user features plus outlier, spike-day and activity-gap counts for a
+    # whole population. The normalized columns go into shared memory once,
+    # sorted by user; workers get only (start, stop) user ranges, so nothing
+    # but two ints per task is pickled.
+    workers = workers or os.cpu_count() or 1
+    packed, offsets = from_frame(df, user_col).sort_by_user()
+    users = packed.users
+    sources = {"day": packed.day, "type": packed.type, "paise": packed.paise, "offsets": offsets}
+    sources |= {name: np.zeros(len(users), dtype=dtype) for name, dtype in OUTPUT_COLUMNS.items()}
+    del packed
+
+    blocks, arrays, specs = [], {}, {}
+    try:
+        for name in list(sources):
+            shm, arrays[name] = _create(sources.pop(name))
+            blocks.append(shm)
+            specs[name] = (shm.name, arrays[name].shape, arrays[name].dtype)
+
+        tasks = _task_bounds(offsets, workers * TASKS_PER_WORKER) if len(users) else []
+        if workers == 1:
+            _arrays.update(arrays)
+            try:
+                for start, stop in tasks:
+                    _run_users(start, stop)
+            finally:
+                _arrays.clear()
+        else:
+            with ProcessPoolExecutor(max_workers=workers, initializer=_attach, initargs=(specs,)) as pool:
+                list(pool.map(_run_users, *zip(*tasks)))
+        results = {name: arrays[name].copy() for name in OUTPUT_COLUMNS}
+    finally:
+        arrays.clear()
+        for shm in blocks:
+            shm.close()
+            shm.unlink()
+
+    summary = pd.DataFrame(results, index=users)
+    features = features_from_totals(summary)
+    return pd.concat([features, summary[["outliers", "spike_days", "activity_gaps"]]], axis=1)
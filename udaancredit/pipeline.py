@@ -0,0 +1,71 @@
+import time
+from contextlib import contextmanager
+
+from .aml import model_outliers, model_version
+from .anomalies import amount_outliers, anomaly_status, daily_volume, find_activity_gaps, spike_days
+from .features import extract_features
+from .graph import counterparty_flags
+from .scoring import assess_risk, calculate_credit_score, eligible_amount, loan_rate
+
+RESULT_COLUMNS = [
+    "transactions",
+    "total_credit",
+    "total_debit",
+    "inflow_count",
+    "outflow_count",
+    "avg_ticket_size",
+    "cashflow_stability",
+    "score",
+    "risk",
+    "eligible",
+    "rate",
+    "outliers",
+    "spike_days",
+    "activity_gaps",
+    "counterparty_flags",
+    "anomaly_status",
+]
+
+
+@contextmanager
+def timed(timings, stage):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        if timings is not None:
+            timings[stage] = timings.get(stage, 0.0) + time.perf_counter() - start
+
+
+def score_transactions(df, timings=None, flags=None):
+    # the dashboard's features -> score -> risk -> loan -> anomaly logic for one
+    # user's normalized transactions, as a flat result row. flags are the
+    # user's counterparty flags from a graph over every user; when None they
+    # come from this statement alone, which cannot see cross-user round trips
+    with timed(timings, "features"):
+        features = extract_features(df)
+    with timed(timings, "score"):
+        score = calculate_credit_score(features)
+        ratio = features["total_credit"] / max(features["total_debit"], 1)
+        risk = assess_risk(score, ratio, len(df))
+    with timed(timings, "anomalies"):
+        # the trained AML model when there is one, as on the dashboard
+        outliers = len(model_outliers(df) if model_version() else amount_outliers(df))
+        spikes = len(spike_days(daily_volume(df)))
+        gaps = len(find_activity_gaps(df["date"]))
+        if flags is None:
+            flags = counterparty_flags(df)
+
+    return {
+        "transactions": len(df),
+        **features,
+        "score": score,
+        "risk": risk,
+        "eligible": eligible_amount(features),
+        "rate": loan_rate(risk),
+        "outliers": outliers,
+        "spike_days": spikes,
+        "activity_gaps": gaps,
+        "counterparty_flags": flags,
+        "anomaly_status": anomaly_status(outliers + spikes + flags),
+    }
@@ -0,0 +1,178 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+
+from . import anomalies, graph
+from .scoring import SCORING_VERSION
+from .windows import DEFAULT_WINDOWS
+
+DEFAULT_PATH = os.environ.get("UDAAN_RESULTS", os.path.join("data", "results.sqlite"))
+DEFAULT_TTL_SECONDS = 7 * 24 * 3600
+DEFAULT_MAX_ENTRIES = 1_000_000
+# a hit only rewrites its LRU timestamp when it is older than this, so repeat
+# lookups stay read-only
+TOUCH_SECONDS = 60
+# single puts check the size bound every this many writes; bulk puts always do
+EVICT_EVERY = 1_000
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS results (
+    user_id TEXT NOT NULL,
+    content_hash TEXT NOT NULL,
+    version TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    created REAL NOT NULL,
+    accessed REAL NOT NULL,
+    PRIMARY KEY (user_id, content_hash, version)
+);
+CREATE INDEX IF NOT EXISTS results_accessed ON results (accessed);
+"""
+
+
+def _results_version():
+    # stored rows carry the anomaly counts and status and the windowed
+    # features as well as the score, so the anomaly and counterparty-graph
+    # thresholds and the window set are part of the version
+    constants = {
+        module.__name__: {name: value for name, value in vars(module).items() if name.isupper()}
+        for module in (anomalies, graph)
+    }
+    constants["scoring"] = SCORING_VERSION
+    constants["windows"] = list(DEFAULT_WINDOWS)
+    return hashlib.sha256(json.dumps(constants, sort_keys=True).encode()).hexdigest()[:12]
+
+
+RESULTS_VERSION = _results_version()
+
+
+def _plain(value):
+    # numpy scalars from the feature and scoring code
+    if isinstance(value, np.generic):
+        return value.item()
+    raise TypeError(f"{type(value).__name__} is not JSON serializable")
+
+
+def content_hashes(df, user_col="user_id"):
+    # per-user hash of the normalized rows, the multi-user counterpart of the
+    # dashboard's upload hash; row order within a user is part of the content
+    columns = [c for c in ("date", "type", "amount", "merchant") if c in df.columns]
+    rows = pd.util.hash_pandas_object(df[columns].astype({"type": str}), index=False).to_numpy()
+    return {
+        user: hashlib.sha256(rows[positions].tobytes()).hexdigest()
+        for user, positions in df.groupby(user_col, sort=False).indices.items()
+    }
+
+
+def file_hash(path, block=1 << 20):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        while chunk := f.read(block):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class ResultStore:
+    # Persistent score results keyed by (user, statement content hash, results
+    # version). A new RESULTS_VERSION simply never hits the old rows, which then
+    # age out through the TTL and LRU bound. SQLite in WAL mode, so batch jobs
+    # and the dashboard can share one file.
+
+    def __init__(self, path=DEFAULT_PATH, ttl=DEFAULT_TTL_SECONDS, max_entries=DEFAULT_MAX_ENTRIES,
+                 version=RESULTS_VERSION):
+        self.path = path
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.version = version
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.executescript(SCHEMA)
+        self._lock = threading.Lock()
+        self._writes = 0
+
+    def get(self, user_id, content_hash):
+        now = time.time()
+        key = (str(user_id), content_hash, self.version)
+        with self._lock:
+            row = self._db.execute(
+                "SELECT payload, created, accessed FROM results WHERE user_id = ? AND content_hash = ? AND version = ?",
+                key,
+            ).fetchone()
+            if row is None or now - row[1] > self.ttl:
+                return None
+            if now - row[2] > TOUCH_SECONDS:
+                self._db.execute(
+                    "UPDATE results SET accessed = ? WHERE user_id = ? AND content_hash = ? AND version = ?",
+                    (now, *key),
+                )
+                self._db.commit()
+        return json.loads(row[0])
+
+    def get_many(self, keys):
+        # {(user_id, content_hash): payload} for the keys that are stored and fresh
+        now = time.time()
+        keys = [(str(user), content_hash) for user, content_hash in keys]
+        with self._lock, self._db:
+            self._db.execute("CREATE TEMP TABLE IF NOT EXISTS wanted (user_id TEXT, content_hash TEXT)")
+            self._db.execute("DELETE FROM wanted")
+            self._db.executemany("INSERT INTO wanted VALUES (?, ?)", keys)
+            rows = self._db.execute(
+                "SELECT r.user_id, r.content_hash, r.payload, r.accessed FROM wanted w "
+                "JOIN results r ON r.user_id = w.user_id AND r.content_hash = w.content_hash AND r.version = ? "
+                "WHERE r.created >= ?",
+                (self.version, now - self.ttl),
+            ).fetchall()
+            stale = [(now, user, content_hash, self.version)
+                     for user, content_hash, _, accessed in rows if now - accessed > TOUCH_SECONDS]
+            self._db.executemany(
+                "UPDATE results SET accessed = ? WHERE user_id = ? AND content_hash = ? AND version = ?", stale
+            )
+        return {(user, content_hash): json.loads(payload) for user, content_hash, payload, _ in rows}
+
+    def put(self, user_id, content_hash, payload):
+        self.put_many([(user_id, content_hash, payload)], evict=False)
+        self._writes += 1
+        if self._writes >= EVICT_EVERY:
+            self.evict()
+
+    def put_many(self, rows, evict=True):
+        # rows: (user_id, content_hash, payload dict); replaces existing entries
+        now = time.time()
+        values = [
+            (str(user), content_hash, self.version, json.dumps(payload, default=_plain), now, now)
+            for user, content_hash, payload in rows
+        ]
+        with self._lock, self._db:
+            self._db.executemany("INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?, ?, ?)", values)
+        if evict:
+            self.evict()
+        return len(values)
+
+    def evict(self):
+        # drops expired entries, then the least recently used beyond max_entries;
+        # returns the number removed
+        with self._lock, self._db:
+            removed = self._db.execute("DELETE FROM results WHERE created < ?", (time.time() - self.ttl,)).rowcount
+            excess = self._db.execute("SELECT COUNT(*) FROM results").fetchone()[0] - self.max_entries
+            if excess > 0:
+                removed += self._db.execute(
+                    "DELETE FROM results WHERE rowid IN (SELECT rowid FROM results ORDER BY accessed LIMIT ?)",
+                    (excess,),
+                ).rowcount
+        self._writes = 0
+        return removed
+
+    def __len__(self):
+        with self._lock:
+            return self._db.execute("SELECT COUNT(*) FROM results").fetchone()[0]
+
+    def close(self):
+        self._db.close()
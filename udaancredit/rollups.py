@@ -0,0 +1,61 @@
+import numpy as np
+import pandas as pd
+
+from .anomalies import daily_volume
+
+# resolution -> pandas frequency; weeks start on Monday and months on the 1st
+RESOLUTIONS = {"day": "D", "week": "W-MON", "month": "MS"}
+MAX_CHART_POINTS = 400
+# a resolution is used while it has at most this many times MAX_CHART_POINTS;
+# LTTB keeps the visual shape of the rest
+OVERSAMPLE = 4
+
+
+def volume_rollups(df, by=None):
+    # day, week and month totals; week and month are rolled up from the daily
+    # totals rather than re-grouping the raw rows. rollups["day"] is exactly
+    # daily_volume(df, by), so spike detection can reuse it.
+    daily = daily_volume(df, by)
+    rollups = {"day": daily}
+    for resolution in ("week", "month"):
+        bins = pd.Grouper(level="date", freq=RESOLUTIONS[resolution], label="left", closed="left")
+        rollups[resolution] = daily.groupby([*(by or []), bins]).sum()
+    return rollups
+
+
+def lttb(x, y, max_points):
+    # Largest-Triangle-Three-Buckets: indices of at most max_points samples that
+    # keep the visual shape (peaks and troughs) of the series; x must be sorted
+    n = len(y)
+    if max_points >= n or max_points < 3:
+        return np.arange(n)
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    edges = np.linspace(1, n - 1, max_points - 1).astype(np.int64)
+    selected = np.empty(max_points, dtype=np.int64)
+    selected[0], selected[-1] = 0, n - 1
+    a = 0
+    for i in range(max_points - 2):
+        start, stop = edges[i], edges[i + 1]
+        if i + 2 < len(edges):
+            next_x = x[stop:edges[i + 2]].mean()
+            next_y = y[stop:edges[i + 2]].mean()
+        else:
+            next_x, next_y = x[-1], y[-1]
+        area = np.abs((x[a] - next_x) * (y[start:stop] - y[a]) - (x[a] - x[start:stop]) * (next_y - y[a]))
+        a = start + int(area.argmax())
+        selected[i + 1] = a
+    return selected
+
+
+def chart_series(rollups, max_points=MAX_CHART_POINTS):
+    # picks the finest resolution that suits the date range, then caps the
+    # number of points sent to the browser with LTTB
+    resolution = "month"
+    for candidate in ("day", "week"):
+        if len(rollups[candidate]) <= max_points * OVERSAMPLE:
+            resolution = candidate
+            break
+    series = rollups[resolution]
+    x = series.index.get_level_values("date").to_numpy().astype("datetime64[s]").astype(np.int64)
+    return resolution, series.iloc[lttb(x, series.to_numpy(), max_points)]
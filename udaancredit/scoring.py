@@ -0,0 +1,186 @@
+import hashlib
+import json
+
+import numpy as np
+
+from .features import window_column
+from .instrumentation import traced
+
+# bump when the scoring logic changes in a way the constants in this module
+# don't capture; threshold edits change SCORING_VERSION on their own
+SCORECARD_REVISION = 1
+
+BASE_SCORE = 300
+MIN_SCORE = 300
+MAX_SCORE = 900
+
+# (cutoff, points) per feature, checked top-down like the original if/elif chain
+CREDIT_BANDS = [(10000, 150), (5000, 120), (2000, 70)]
+STABILITY_BANDS = [(1.5, 150), (1.0, 120), (0.8, 60)]
+TICKET_BANDS = [(800, 150), (400, 100), (200, 60)]
+INFLOW_BANDS = [(8, 80), (5, 50), (3, 25)]
+
+OUTFLOW_PENALTY = 100
+LOW_CREDIT_CUTOFF = 500
+LOW_CREDIT_PENALTY = 60
+
+LOW_RISK_CUTOFF = 720
+MODERATE_RISK_CUTOFF = 580
+
+SCORE_FEATURES = [
+    "total_credit",
+    "cashflow_stability",
+    "avg_ticket_size",
+    "inflow_count",
+    "outflow_count",
+]
+
+
+def _band_points(values, bands, inclusive):
+    if inclusive:
+        conditions = [values >= cutoff for cutoff, _ in bands]
+    else:
+        conditions = [values > cutoff for cutoff, _ in bands]
+    return np.select(conditions, [points for _, points in bands], default=0)
+
+
+def _band_point(value, bands, inclusive):
+    # scalar counterpart of _band_points, for the per-user call sites
+    for cutoff, points in bands:
+        if value >= cutoff if inclusive else value > cutoff:
+            return points
+    return 0
+
+
+def _windowed(features, window):
+    if window is None:
+        return features
+    return {name: features[window_column(name, window)] for name in SCORE_FEATURES}
+
+
+@traced("scoring.calculate_credit_scores")
+def calculate_credit_scores(features, window=None):
+    # features: DataFrame or mapping of equal-length arrays keyed by SCORE_FEATURES,
+    # or by their windowed names (total_credit_90d, ...) when window=90
+    features = _windowed(features, window)
+    total_credit = np.asarray(features["total_credit"], dtype=float)
+    stability = np.asarray(features["cashflow_stability"], dtype=float)
+    avg = np.asarray(features["avg_ticket_size"], dtype=float)
+    inflow = np.asarray(features["inflow_count"], dtype=float)
+    outflow = np.asarray(features["outflow_count"], dtype=float)
+
+    score = np.full(total_credit.shape, BASE_SCORE, dtype=np.int64)
+    score += _band_points(total_credit, CREDIT_BANDS, inclusive=False)
+    score += _band_points(stability, STABILITY_BANDS, inclusive=True)
+    score += _band_points(avg, TICKET_BANDS, inclusive=False)
+    score += _band_points(inflow, INFLOW_BANDS, inclusive=True)
+
+    score -= np.where(outflow > inflow, OUTFLOW_PENALTY, 0)
+    score -= np.where(total_credit < LOW_CREDIT_CUTOFF, LOW_CREDIT_PENALTY, 0)
+
+    return np.clip(score, MIN_SCORE, MAX_SCORE)
+
+
+def risk_categories(scores):
+    scores = np.asarray(scores)
+    return np.select(
+        [scores >= LOW_RISK_CUTOFF, scores >= MODERATE_RISK_CUTOFF],
+        ["Low Risk", "Moderate Risk"],
+        default="High Risk",
+    ).astype(object)
+
+
+def calculate_credit_score(features, window=None):
+    # same band tables as calculate_credit_scores, without the array overhead
+    features = _windowed(features, window)
+    total_credit = float(features["total_credit"])
+    inflow = float(features["inflow_count"])
+
+    score = BASE_SCORE
+    score += _band_point(total_credit, CREDIT_BANDS, inclusive=False)
+    score += _band_point(float(features["cashflow_stability"]), STABILITY_BANDS, inclusive=True)
+    score += _band_point(float(features["avg_ticket_size"]), TICKET_BANDS, inclusive=False)
+    score += _band_point(inflow, INFLOW_BANDS, inclusive=True)
+
+    if float(features["outflow_count"]) > inflow:
+        score -= OUTFLOW_PENALTY
+    if total_credit < LOW_CREDIT_CUTOFF:
+        score -= LOW_CREDIT_PENALTY
+
+    return max(MIN_SCORE, min(score, MAX_SCORE))
+
+
+def risk_category(score):
+    if score >= LOW_RISK_CUTOFF:
+        return "Low Risk"
+    elif score >= MODERATE_RISK_CUTOFF:
+        return "Moderate Risk"
+    return "High Risk"
+
+
+# Dashboard risk bands: combine the score with the credit/debit ratio and activity level
+DASHBOARD_LOW_RISK_SCORE = 720
+DASHBOARD_LOW_RISK_RATIO = 1.2
+DASHBOARD_LOW_RISK_MIN_TXNS = 20
+DASHBOARD_MODERATE_RISK_SCORE = 620
+DASHBOARD_MODERATE_RISK_RATIO = 0.9
+
+LOAN_FRACTION = 0.3
+# annual interest per band; bands without a rate are not offered a loan
+ANNUAL_RATES = {
+    "Low Risk": 0.145,
+    "Moderate Risk": 0.18,
+}
+LOAN_RATES = {risk: f"{ANNUAL_RATES[risk]:.1%} p.a." if risk in ANNUAL_RATES else "N/A"
+              for risk in ("Low Risk", "Moderate Risk", "High Risk")}
+
+
+def credit_debit_ratios(total_credit, total_debit):
+    return np.asarray(total_credit, dtype=float) / np.maximum(np.asarray(total_debit, dtype=float), 1)
+
+
+def assess_risks(scores, ratios, txn_counts):
+    scores = np.asarray(scores)
+    ratios = np.asarray(ratios)
+    txn_counts = np.asarray(txn_counts)
+    low = (
+        (scores >= DASHBOARD_LOW_RISK_SCORE)
+        & (ratios > DASHBOARD_LOW_RISK_RATIO)
+        & (txn_counts > DASHBOARD_LOW_RISK_MIN_TXNS)
+    )
+    moderate = (scores >= DASHBOARD_MODERATE_RISK_SCORE) & (ratios > DASHBOARD_MODERATE_RISK_RATIO)
+    return np.select([low, moderate], ["Low Risk", "Moderate Risk"], default="High Risk").astype(object)
+
+
+def assess_risk(score, ratio, txn_count):
+    if (
+        score >= DASHBOARD_LOW_RISK_SCORE
+        and ratio > DASHBOARD_LOW_RISK_RATIO
+        and txn_count > DASHBOARD_LOW_RISK_MIN_TXNS
+    ):
+        return "Low Risk"
+    if score >= DASHBOARD_MODERATE_RISK_SCORE and ratio > DASHBOARD_MODERATE_RISK_RATIO:
+        return "Moderate Risk"
+    return "High Risk"
+
+
+def eligible_amounts(total_credit):
+    return (np.asarray(total_credit, dtype=float) * LOAN_FRACTION).astype(np.int64)
+
+
+def eligible_amount(features):
+    return int(features["total_credit"] * LOAN_FRACTION)
+
+
+def loan_rate(risk):
+    return LOAN_RATES[risk]
+
+
+def _scorecard_version():
+    # hash of every module constant (bands, cutoffs, rates), so cached and
+    # persisted results are invalidated whenever a threshold is edited
+    constants = {name: value for name, value in globals().items() if name.isupper()}
+    return hashlib.sha256(json.dumps(constants, sort_keys=True).encode()).hexdigest()[:12]
+
+
+SCORING_VERSION = _scorecard_version()
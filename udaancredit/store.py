@@ -0,0 +1,142 @@
+import hashlib
+import os
+import uuid
+from urllib.parse import quote, unquote
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+from .fingerprints import add_to_index, contains, fingerprints, load_index
+from .ingest import TYPE_DTYPE
+
+DEFAULT_ROOT = os.environ.get("UDAAN_STORE", os.path.join("data", "transactions"))
+# per-user fingerprint indexes live beside the partitions; pyarrow skips "_" paths
+FINGERPRINT_DIR = "_fingerprints"
+
+SCHEMA = pa.schema([
+    ("date", pa.timestamp("us")),
+    ("type", pa.string()),
+    ("amount", pa.float64()),
+    ("merchant", pa.string()),
+    ("user_id", pa.string()),
+    ("month", pa.string()),
+])
+# Layout: <root>/user_id=<id>/month=<YYYY-MM>/part-<uuid>-<n>.parquet
+PARTITIONING = ds.partitioning(
+    pa.schema([("user_id", pa.string()), ("month", pa.string())]),
+    flavor="hive",
+)
+
+
+def new_transactions(df, user_id, root=DEFAULT_ROOT):
+    # rows of one user's frame that are not in the stored history yet, and their fingerprints
+    fps = fingerprints(df)
+    fresh = ~contains(load_index(user_id, os.path.join(root, FINGERPRINT_DIR)), fps)
+    return df[fresh], fps[fresh]
+
+
+def append_transactions(df, user_id=None, root=DEFAULT_ROOT):
+    # appends normalized transactions (date, type, amount, ...) as new part files;
+    # existing files are never rewritten, and rows already stored for the user
+    # (an overlapping re-upload) are skipped. Returns the number of rows added.
+    if len(df) == 0:
+        return 0
+    df = df.copy()
+    if user_id is not None:
+        df["user_id"] = str(user_id)
+    elif "user_id" not in df.columns:
+        raise ValueError("user_id is required when the frame has no user_id column")
+    df["user_id"] = df["user_id"].astype(str)
+
+    fresh, fps = [], {}
+    for user, rows in df.groupby("user_id", sort=False):
+        rows, fps[user] = new_transactions(rows, user, root)
+        fresh.append(rows)
+    df = pd.concat(fresh)
+    if len(df) == 0:
+        return 0
+    df["month"] = pd.to_datetime(df["date"]).dt.strftime("%Y-%m")
+    df["type"] = df["type"].astype(str)
+    if "merchant" not in df.columns:
+        df["merchant"] = None
+
+    table = pa.Table.from_pandas(df[SCHEMA.names], schema=SCHEMA, preserve_index=False)
+    pq.write_to_dataset(
+        table,
+        root,
+        partitioning=PARTITIONING,
+        basename_template=f"part-{uuid.uuid4().hex}-{{i}}.parquet",
+        existing_data_behavior="overwrite_or_ignore",
+    )
+    # the index is only updated once the rows are durably written
+    for user, user_fps in fps.items():
+        if len(user_fps):
+            add_to_index(user, user_fps, os.path.join(root, FINGERPRINT_DIR))
+    return len(df)
+
+
+def _filters(user_id, start, end):
+    filters = []
+    if user_id is not None:
+        if isinstance(user_id, (list, tuple, set)):
+            filters.append(("user_id", "in", [str(u) for u in user_id]))
+        else:
+            filters.append(("user_id", "=", str(user_id)))
+    # month bounds prune whole partitions; the date bounds then trim the edges
+    if start is not None:
+        start = pd.Timestamp(start)
+        filters.append(("month", ">=", start.strftime("%Y-%m")))
+        filters.append(("date", ">=", start))
+    if end is not None:
+        end = pd.Timestamp(end)
+        filters.append(("month", "<=", end.strftime("%Y-%m")))
+        filters.append(("date", "<=", end))
+    return filters or None
+
+
+def read_transactions(user_id=None, start=None, end=None, columns=None, root=DEFAULT_ROOT):
+    if not os.path.isdir(root):
+        return pd.DataFrame(columns=columns or ["date", "type", "amount"])
+    table = pq.read_table(
+        root,
+        columns=columns,
+        filters=_filters(user_id, start, end),
+        partitioning=PARTITIONING,
+        schema=SCHEMA,
+        memory_map=True,
+    )
+    df = table.to_pandas()
+    if "month" in df.columns and (columns is None or "month" not in columns):
+        df = df.drop(columns="month")
+    if "type" in df.columns:
+        df["type"] = df["type"].astype(str).astype(TYPE_DTYPE)
+    if "user_id" in df.columns:
+        df["user_id"] = df["user_id"].astype(str)
+    if "date" in df.columns:
+        df = df.sort_values("date", kind="stable").reset_index(drop=True)
+    return df
+
+
+def list_users(root=DEFAULT_ROOT):
+    if not os.path.isdir(root):
+        return []
+    return sorted(
+        unquote(name.split("=", 1)[1])
+        for name in os.listdir(root)
+        if name.startswith("user_id=")
+    )
+
+
+def store_signature(user_id, root=DEFAULT_ROOT):
+    # changes whenever a part file is added for the user; used as a cache key
+    user_dir = os.path.join(root, f"user_id={quote(str(user_id), safe='')}")
+    if not os.path.isdir(user_dir):
+        return None
+    digest = hashlib.sha256()
+    for dirpath, _, filenames in sorted(os.walk(user_dir)):
+        for name in sorted(filenames):
+            stat = os.stat(os.path.join(dirpath, name))
+            digest.update(f"{dirpath}/{name}:{stat.st_size}:{stat.st_mtime_ns}".encode())
+    return digest.hexdigest()
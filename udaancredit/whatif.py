@@ -0,0 +1,166 @@
+import argparse
+import json
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+from . import scoring
+from .features import stream_features
+
+# scorecard knobs a what-if config may override, named after the scoring.py constants
+BAND_FEATURES = {
+    "CREDIT_BANDS": ("total_credit", False),
+    "STABILITY_BANDS": ("cashflow_stability", True),
+    "TICKET_BANDS": ("avg_ticket_size", False),
+    "INFLOW_BANDS": ("inflow_count", True),
+}
+SCORECARD_KEYS = [
+    *BAND_FEATURES,
+    "OUTFLOW_PENALTY",
+    "LOW_CREDIT_CUTOFF",
+    "LOW_CREDIT_PENALTY",
+    "DASHBOARD_LOW_RISK_SCORE",
+    "DASHBOARD_LOW_RISK_RATIO",
+    "DASHBOARD_LOW_RISK_MIN_TXNS",
+    "DASHBOARD_MODERATE_RISK_SCORE",
+    "DASHBOARD_MODERATE_RISK_RATIO",
+    "LOAN_FRACTION",
+]
+RISKS = ["Low Risk", "Moderate Risk", "High Risk"]
+
+
+def baseline_scorecard():
+    return {key: getattr(scoring, key) for key in SCORECARD_KEYS}
+
+
+class WhatIf:
+    # Rescoring a population under many threshold configs. Each feature is
+    # binned once against every cutoff seen so far (searchsorted); a config's
+    # band points then become a lookup table indexed by bin, so evaluating a
+    # config is a handful of O(n) gathers instead of re-running the scorecard.
+
+    def __init__(self, features):
+        self.users = len(features)
+        self.values = {
+            name: np.asarray(features[name], dtype=float)
+            for name in ["total_credit", "total_debit", *scoring.SCORE_FEATURES]
+        }
+        self.ratios = scoring.credit_debit_ratios(self.values["total_credit"], self.values["total_debit"])
+        self.txns = self.values["inflow_count"] + self.values["outflow_count"]
+        self.outflow_penalised = self.values["outflow_count"] > self.values["inflow_count"]
+        self._cuts = {}
+        self._bins = {}
+        self.baseline = self.evaluate({})
+
+    def _binned(self, feature, inclusive, cutoffs):
+        # bin = number of known cutoffs c with value > c (or >= c when inclusive)
+        key = (feature, inclusive)
+        cuts = self._cuts.get(key, np.empty(0))
+        if not np.isin(cutoffs, cuts).all():
+            cuts = np.union1d(cuts, cutoffs)
+            side = "right" if inclusive else "left"
+            self._cuts[key] = cuts
+            self._bins[key] = np.searchsorted(cuts, self.values[feature], side=side)
+        return cuts, self._bins[key]
+
+    def _band_points(self, feature, inclusive, bands):
+        cuts, bins = self._binned(feature, inclusive, [cutoff for cutoff, _ in bands])
+        # bands are checked top-down, so walk them in reverse and let earlier
+        # bands overwrite the bins they also match
+        table = np.zeros(len(cuts) + 1, dtype=np.int32)
+        for cutoff, points in reversed(bands):
+            table[np.searchsorted(cuts, cutoff) + 1:] = points
+        return table[bins]
+
+    def scores(self, config):
+        card = baseline_scorecard() | config
+        score = np.full(self.users, scoring.BASE_SCORE, dtype=np.int32)
+        for key, (feature, inclusive) in BAND_FEATURES.items():
+            score += self._band_points(feature, inclusive, card[key])
+        score -= np.where(self.outflow_penalised, card["OUTFLOW_PENALTY"], 0)
+        cuts, bins = self._binned("total_credit", True, [card["LOW_CREDIT_CUTOFF"]])
+        low_credit = bins <= np.searchsorted(cuts, card["LOW_CREDIT_CUTOFF"])
+        score -= np.where(low_credit, card["LOW_CREDIT_PENALTY"], 0)
+        return np.clip(score, scoring.MIN_SCORE, scoring.MAX_SCORE)
+
+    def evaluate(self, config):
+        card = baseline_scorecard() | config
+        score = self.scores(config)
+        low = (
+            (score >= card["DASHBOARD_LOW_RISK_SCORE"])
+            & (self.ratios > card["DASHBOARD_LOW_RISK_RATIO"])
+            & (self.txns > card["DASHBOARD_LOW_RISK_MIN_TXNS"])
+        )
+        moderate = ~low & (score >= card["DASHBOARD_MODERATE_RISK_SCORE"]) & (
+            self.ratios > card["DASHBOARD_MODERATE_RISK_RATIO"]
+        )
+        approved = low | moderate
+        eligible = (self.values["total_credit"][approved] * card["LOAN_FRACTION"]).astype(np.int64)
+        users = max(self.users, 1)
+        return {
+            "mean_score": float(score.mean()) if self.users else 0.0,
+            "Low Risk": int(low.sum()) / users,
+            "Moderate Risk": int(moderate.sum()) / users,
+            "High Risk": int((~approved).sum()) / users,
+            "approval_rate": int(approved.sum()) / users,
+            "approved_eligible": int(eligible.sum()),
+        }
+
+    def compare(self, configs):
+        # configs: {name: overrides}; one row per config with deltas vs the
+        # current scorecard
+        rows = {"baseline": self.baseline}
+        for name, config in configs.items():
+            rows[name] = self.evaluate(config)
+        report = pd.DataFrame.from_dict(rows, orient="index")
+        report["approval_rate_delta"] = report["approval_rate"] - self.baseline["approval_rate"]
+        report["eligible_delta"] = report["approved_eligible"] - self.baseline["approved_eligible"]
+        return report
+
+
+def _parse_config(config):
+    # JSON has no tuples: band lists arrive as [[cutoff, points], ...]
+    return {
+        key: [tuple(band) for band in value] if key in BAND_FEATURES else value
+        for key, value in config.items()
+    }
+
+
+def load_grid(path):
+    with open(path) as f:
+        grid = json.load(f)
+    unknown = {key for config in grid.values() for key in config} - set(SCORECARD_KEYS)
+    if unknown:
+        raise ValueError(f"unknown scorecard keys: {', '.join(sorted(unknown))}")
+    return {name: _parse_config(config) for name, config in grid.items()}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Rescore a population under alternative scorecard thresholds.")
+    parser.add_argument("transactions", help="multi-user transaction CSV (user_id, type, amount)")
+    parser.add_argument("grid", help='JSON {"name": {"CREDIT_BANDS": [[12000, 150], ...], ...}, ...}')
+    parser.add_argument("--user-col", default="user_id")
+    parser.add_argument("-o", "--output", help="also write the report as CSV")
+    args = parser.parse_args(argv)
+
+    grid = load_grid(args.grid)
+    start = time.perf_counter()
+    engine = WhatIf(stream_features(args.transactions, user_col=args.user_col))
+    loaded = time.perf_counter() - start
+    start = time.perf_counter()
+    report = engine.compare(grid)
+    elapsed = time.perf_counter() - start
+
+    with pd.option_context("display.width", 200, "display.max_columns", None):
+        print(report.round(4))
+    print(f"{engine.users} users loaded in {loaded:.2f}s; "
+          f"{len(grid)} configs in {elapsed * 1000:.1f} ms ({elapsed * 1000 / max(len(grid), 1):.2f} ms/config)")
+    if args.output:
+        report.to_csv(args.output, index_label="config")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,76 @@
+import numpy as np
+import pandas as pd
+
+from .compact import CREDIT, PAISE_PER_RUPEE, from_frame
+from .features import FEATURE_COLUMNS, features_from_totals, window_column
+
+DEFAULT_WINDOWS = (30, 90, 180)
+# day ordinals are int32; shifting them to unsigned lets (user, day) pack into one int64 key
+_DAY_OFFSET = 2**31
+
+
+class WindowIndex:
+    # Prefix sums of credit/debit amounts and counts over rows sorted by
+    # (user, day). A trailing window for every user is two searchsorted calls
+    # on the packed (user, day) keys and one subtraction, so any number of
+    # windows is answered from one precomputation.
+
+    def __init__(self, df, user_col="user_id"):
+        packed, _ = from_frame(df, user_col).sort_by_user()
+        self.users = packed.users.rename(user_col)
+        self.last_day = int(packed.day.max()) if len(packed) else 0
+        self.keys = (packed.user.astype(np.int64) << 32) | (packed.day.astype(np.int64) + _DAY_OFFSET)
+        credit = packed.type == CREDIT
+        columns = np.column_stack([
+            np.where(credit, packed.paise, 0),
+            np.where(credit, 0, packed.paise),
+            credit,
+            ~credit,
+        ])
+        self.prefix = np.zeros((len(packed) + 1, 4), dtype=np.int64)
+        np.cumsum(columns, axis=0, out=self.prefix[1:])
+
+    def _day(self, as_of):
+        if as_of is None:
+            return self.last_day
+        return int(np.datetime64(pd.Timestamp(as_of).date(), "D").astype(np.int64))
+
+    def totals(self, days=None, as_of=None):
+        # totals over the `days` days ending on as_of (default: the latest
+        # transaction date in the index); days=None means all history up to as_of
+        end = self._day(as_of)
+        start = np.iinfo(np.int32).min if days is None else end - days + 1
+        users = np.arange(len(self.users), dtype=np.int64) << 32
+        lo = np.searchsorted(self.keys, users | (start + _DAY_OFFSET))
+        hi = np.searchsorted(self.keys, users | (end + _DAY_OFFSET), side="right")
+        window = self.prefix[hi] - self.prefix[lo]
+        return pd.DataFrame(
+            {
+                "total_credit": window[:, 0] / PAISE_PER_RUPEE,
+                "total_debit": window[:, 1] / PAISE_PER_RUPEE,
+                "inflow_count": window[:, 2],
+                "outflow_count": window[:, 3],
+            },
+            index=self.users,
+        )
+
+    def features(self, days=None, as_of=None):
+        return features_from_totals(self.totals(days, as_of))
+
+    def windowed_features(self, windows=DEFAULT_WINDOWS, as_of=None):
+        # one wide frame: total_credit_30d, ..., cashflow_stability_180d
+        return pd.concat(
+            [
+                self.features(days, as_of).rename(columns=lambda name, days=days: window_column(name, days))
+                for days in windows
+            ],
+            axis=1,
+        )
+
+
+def windowed_features(df, windows=DEFAULT_WINDOWS, as_of=None):
+    # single statement -> {"total_credit_30d": ..., ...}, to merge into the
+    # dict from extract_features
+    if len(df) == 0:
+        return {window_column(name, days): 0 for days in windows for name in FEATURE_COLUMNS}
+    return WindowIndex(df, user_col=None).windowed_features(windows, as_of).iloc[0].to_dict()